@@ -27,13 +27,39 @@ __author__ = "CodeCollector Team"
 __email__ = "info@codecollector.dev"
 __license__ = "MIT"
 
-# Импорты основных классов для удобного использования
-from .main import CodeCollectorApp, main
-from .collector import CodeCollector
-from .config import Config, ConfigManager
-from .models import TreeNode, ProjectSettings
-from .selector import InteractiveSelector
-from .writers import MarkdownWriter, TextWriter, OutputWriter
+import importlib
+
+# Основные классы импортируются лениво при первом обращении (PEP 562),
+# чтобы `import codecollector` и `codecollector --help` не грузили весь пакет
+_LAZY_IMPORTS = {
+    'CodeCollectorApp': '.main',
+    'main': '.main',
+    'CodeCollector': '.collector',
+    'Config': '.config',
+    'ConfigManager': '.config',
+    'TreeNode': '.models',
+    'ProjectSettings': '.models',
+    'InteractiveSelector': '.selector',
+    'MarkdownWriter': '.writers',
+    'TextWriter': '.writers',
+    'OutputWriter': '.writers',
+}
+
+
+def __getattr__(name):
+    """Импортирует экспортируемый класс при первом обращении и кэширует его"""
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
+
 
 # Экспортируемые символы
 __all__ = [
@@ -5,112 +5,287 @@
 Очищенная версия collector.py без лишнего вывода
 """
 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from codecollector.config import Config
-from codecollector.utils import GitignoreHandler, FileFilters
+from codecollector.utils import GitignoreHandler, GitignoreMatcher, FileFilters, json_dumps, json_loads
+
+# С какого количества файлов без расширения проверять их содержимое в потоках
+PARALLEL_SNIFF_THRESHOLD = 32
+
+# Если чтение директории в среднем дольше этого (секунды) на первых
+# SLOW_SCAN_SAMPLE папках, остальные читаются в пуле потоков
+SLOW_SCANDIR_SECONDS = 0.002
+SLOW_SCAN_SAMPLE = 16
+
+# Как часто (секунды) сообщать о ходе сканирования, чтобы не перегружать вывод
+PROGRESS_INTERVAL = 0.1
+
+# Кэш результатов проверки содержимого между запусками. Лежит в подпапке,
+# чтобы не совпасть с файлом настроек .codecollector/<имя_проекта>.json
+SCAN_CACHE_FILE = Path('cache') / 'scan.json'
+SCAN_CACHE_VERSION = 1
 
 
 class CodeCollector:
     """
     Основной класс для сбора файлов проекта
     Сканирует директорию, применяет фильтры, сортирует результат
+    При debug=True печатает краткую сводку сканирования
     """
     
-    def __init__(self, root_path: Path, config: Config):
-        self.root_path = root_path.resolve()
+    def __init__(self, root_path: Path, config: Config, debug: bool = False):
+        # Уже абсолютный путь (приложение разрешает его заранее) не разрешаем повторно
+        self.root_path = root_path if root_path.is_absolute() else root_path.resolve()
         self.config = config
+        self.debug = debug
         self.gitignore_patterns = []
+        self.gitignore_matcher = GitignoreMatcher([])
+        # Содержимое маленьких файлов, прочитанных целиком при проверке на бинарность
+        self.file_contents: Dict[Path, bytes] = {}
+        # Время последней серии последовательных чтений директорий (см. _walk)
+        self._last_scan_time = 0.0
+        
+        self.scan_cache_file = self.root_path / '.codecollector' / SCAN_CACHE_FILE
+        
+        # Префикс корня для получения относительных путей срезом строки
+        root_str = str(self.root_path)
+        self._root_prefix = root_str if root_str.endswith(os.sep) else root_str + os.sep
+        
+    def scan_and_collect(self, progress: Optional[Callable[[int], None]] = None) -> List[Path]:
+        """
+        Сканирует директорию и собирает файлы с учетом фильтров.
+        progress(найдено_файлов) вызывается во время обхода не чаще,
+        чем раз в PROGRESS_INTERVAL секунд
+        """
+        if self.debug:
+            print(f"Сканирование директории: {self.root_path}")
         
-    def scan_and_collect(self) -> List[Path]:
-        """Сканирует директорию и собирает файлы с учетом фильтров"""
         # Загружаем .gitignore паттерны БЕЗ ВЫВОДА
         self._load_gitignore_patterns()
+        if self.debug and self.gitignore_patterns:
+            print(f"Загружено паттернов из .gitignore: {len(self.gitignore_patterns)}")
         
         # Собираем файлы БЕЗ ВЫВОДА
-        collected_files = []
-        for file_path in self.root_path.rglob('*'):
-            if self._should_include_file(file_path):
-                collected_files.append(file_path)
+        self.file_contents = {}
+        # Фильтры по имени и пути и stat выполняются при чтении директорий
+        # (в _scan_dir), stat переиспользуется до сортировки
+        # До самого конца пути - строки: Path создается только для результата
+        candidates = []
+        unknown = []  # файлы без расширения - тип определяется по содержимому
+        next_report = time.perf_counter() + PROGRESS_INTERVAL
+        for path_str, file_ext, st in self._walk(str(self.root_path)):
+            if file_ext:
+                candidates.append((path_str, st))
+            else:
+                unknown.append((path_str, st))
+            
+            if progress is not None:
+                now = time.perf_counter()
+                if now >= next_report:
+                    progress(len(candidates) + len(unknown))
+                    next_report = now + PROGRESS_INTERVAL
+        
+        candidates.extend(self._classify_by_content(unknown))
+        if self.debug:
+            print(f"Найдено файлов: {len(candidates)}")
         
         # Сортируем файлы БЕЗ ВЫВОДА
+        # Ключи считаются один раз на файл из уже полученных данных:
+        # целые наносекунды mtime и части строки пути (тот же порядок, что у Path)
         if self.config.sort_by_time:
-            collected_files.sort(key=lambda f: f.stat().st_mtime, reverse=True)
+            candidates.sort(key=lambda pair: pair[1].st_mtime_ns, reverse=True)
         else:
-            collected_files.sort()
+            candidates.sort(key=lambda pair: os.path.normcase(pair[0]).split(os.sep))
         
-        return collected_files
+        return [Path(path_str) for path_str, _ in candidates]
+    
+    def _walk(self, root_dir: str) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """
+        Обходит директорию через os.scandir по уровням, отсекая служебные
+        папки и папки из .gitignore до входа в них. Возвращает
+        (путь, расширение, stat) для непустых файлов, прошедших фильтры
+        по имени и пути. Порядок файлов не важен - результат
+        сортируется после обхода.
+        
+        Чтение директорий - блокирующий I/O. На локальном диске с теплым
+        кэшем потоки только мешают (GIL), поэтому сначала папки читаются
+        последовательно. Если чтение оказывается медленным (сетевой диск,
+        холодный кэш), остальные уровни читаются в пуле потоков, чтобы
+        задержки отдельных папок перекрывались; stat файлов при этом
+        тоже выполняется в потоках
+        """
+        frontier = [root_dir]
+        parallel = False
+        scanned = 0
+        elapsed = 0.0
+        
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        # Потоки пула создаются только при первой отправке задачи
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while frontier:
+                next_frontier = []
+                
+                if parallel and len(frontier) > 1:
+                    results = executor.map(self._scan_dir, frontier)
+                else:
+                    results = self._scan_dirs_timed(frontier)
+                
+                for subdirs, files in results:
+                    next_frontier.extend(subdirs)
+                    yield from files
+                
+                if not parallel:
+                    scanned += len(frontier)
+                    elapsed += self._last_scan_time
+                    parallel = (scanned >= SLOW_SCAN_SAMPLE and
+                                elapsed / scanned > SLOW_SCANDIR_SECONDS)
+                frontier = next_frontier
+    
+    def _scan_dirs_timed(self, dirpaths: List[str]) -> Iterator[Tuple[List[str], List[Tuple[str, str, os.stat_result]]]]:
+        """Последовательно читает директории, суммируя время чтения в _last_scan_time"""
+        self._last_scan_time = 0.0
+        for dirpath in dirpaths:
+            started = time.perf_counter()
+            result = self._scan_dir(dirpath)
+            self._last_scan_time += time.perf_counter() - started
+            yield result
+    
+    def _scan_dir(self, dirpath: str) -> Tuple[List[str], List[Tuple[str, str, os.stat_result]]]:
+        """
+        Читает одну директорию: (подпапки для обхода, подходящие файлы).
+        stat берется только у файлов, прошедших фильтры по имени и пути
+        """
+        subdirs = []
+        files = []
+        get_extension = FileFilters.get_extension
+        try:
+            with os.scandir(dirpath) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            # Служебные и игнорируемые .gitignore папки
+                            # отсекаются целиком, без обхода их содержимого
+                            if not (FileFilters.should_skip_directory(entry.name) or
+                                    self.gitignore_matcher.is_ignored(self._relative_path(entry.path), True)):
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            # Расширение считается один раз на файл и передается в проверки
+                            name = entry.name
+                            file_ext = get_extension(name)
+                            if not self._should_include_file(entry.path, name, file_ext):
+                                continue
+                            st = entry.stat()
+                            # Пустые файлы не включаем
+                            if st.st_size:
+                                files.append((entry.path, file_ext, st))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return subdirs, files
     
     def _load_gitignore_patterns(self):
         """Загружает паттерны из .gitignore БЕЗ ВЫВОДА"""
         main_gitignore = self.root_path / '.gitignore'
         self.gitignore_patterns = GitignoreHandler.parse_gitignore(main_gitignore)
+        self.gitignore_matcher = GitignoreMatcher(self.gitignore_patterns)
+    
+    def _relative_path(self, path_str: str) -> str:
+        """Возвращает путь относительно корня проекта с разделителем '/'"""
+        rel_path = path_str[len(self._root_prefix):]
+        if os.sep != '/':
+            rel_path = rel_path.replace(os.sep, '/')
+        return rel_path
     
-    def _should_include_file(self, file_path: Path) -> bool:
-        """Проверяет, нужно ли включать файл в коллекцию"""
-        # Пропускаем директории
-        if file_path.is_dir():
+    def _should_include_file(self, path_str: str, name: str, file_ext: str) -> bool:
+        """Проверяет по имени и пути, нужно ли включать файл в коллекцию (без stat)"""
+        # Сначала дешевые проверки по имени (поиск в наборах), регулярное
+        # выражение .gitignore - только для прошедших их файлов
+        if FileFilters.should_skip_file(name, file_ext):
             return False
         
-        # Проверяем .gitignore паттерны
-        if GitignoreHandler.is_ignored_by_gitignore(file_path, self.root_path, self.gitignore_patterns):
+        # Тип файла с расширением определяется по расширению без чтения
+        # файла; файлы без расширения проверяются по содержимому в
+        # _classify_by_content
+        if file_ext and file_ext not in FileFilters.TEXT_EXTENSIONS:
             return False
-            
-        # Проверяем, не находится ли файл в исключаемой директории
-        for parent in file_path.parents:
-            if FileFilters.should_skip_directory(parent.name):
-                return False
         
-        # Пропускаем файлы по маске
-        if FileFilters.should_skip_file(file_path):
-            return False
-            
-        # Проверяем, что файл текстовый
-        if not FileFilters.is_text_file(file_path):
-            return False
-            
-        # Проверяем, что файл не пустой
-        try:
-            if file_path.stat().st_size == 0:
-                return False
-        except OSError:
+        # Проверяем .gitignore паттерны
+        if self.gitignore_matcher.is_ignored(self._relative_path(path_str)):
             return False
             
         return True
-
-# Альтернатива - минимальный вывод только для debug режима
-class CodeCollectorWithDebug:
-    """Версия с опциональным debug выводом"""
     
-    def scan_and_collect(self) -> List[Path]:
-        """Сканирует директорию и собирает файлы"""
-        debug = "--debug" in sys.argv
+    def _classify_by_content(self, pairs: List[Tuple[str, os.stat_result]]) -> List[Tuple[str, os.stat_result]]:
+        """
+        Оставляет текстовые файлы среди файлов без расширения.
+        Чтение начала файлов - блокирующий I/O, поэтому на больших
+        наборах оно выполняется в пуле потоков
+        """
+        old_cache = self._load_scan_cache()
+        new_cache = {}
         
-        if debug:
-            print(f"Сканирование директории: {self.root_path}")
+        # Неизменившиеся с прошлого запуска файлы (тот же размер и mtime) не читаем
+        text_pairs = []
+        to_sniff = []
+        for path_str, st in pairs:
+            rel_path = self._relative_path(path_str)
+            cached = old_cache.get(rel_path)
+            if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                new_cache[rel_path] = cached
+                if cached[2]:
+                    text_pairs.append((path_str, st))
+            else:
+                to_sniff.append((path_str, st, rel_path))
         
-        # Загружаем .gitignore паттерны
-        self._load_gitignore_patterns()
-        if debug and self.gitignore_patterns:
-            print(f"Загружено паттернов из .gitignore: {len(self.gitignore_patterns)}")
+        paths = [path_str for path_str, _, _ in to_sniff]
+        if len(paths) < PARALLEL_SNIFF_THRESHOLD:
+            heads = [FileFilters.sniff_file(path_str) for path_str in paths]
+        else:
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                heads = list(executor.map(FileFilters.sniff_file, paths))
         
-        # Собираем файлы
-        collected_files = []
-        for file_path in self.root_path.rglob('*'):
-            if self._should_include_file(file_path):
-                collected_files.append(file_path)
+        for (path_str, st, rel_path), head in zip(to_sniff, heads):
+            if head is None:
+                continue
+            
+            is_text = FileFilters.is_text_file(path_str, head)
+            new_cache[rel_path] = [st.st_size, st.st_mtime_ns, is_text]
+            if not is_text:
+                continue
+            
+            # Файл прочитан целиком - writer возьмет содержимое отсюда
+            if len(head) == st.st_size:
+                self.file_contents[Path(path_str)] = head
+            text_pairs.append((path_str, st))
         
-        if debug:
-            print(f"Найдено файлов: {len(collected_files)}")
+        if new_cache != old_cache:
+            self._save_scan_cache(new_cache)
         
-        # Сортируем файлы
-        if self.config.sort_by_time:
-            if debug:
-                print("Сортировка по времени изменения (новые сверху)...")
-            collected_files.sort(key=lambda f: f.stat().st_mtime, reverse=True)
-        else:
-            if debug:
-                print("Сортировка по имени файла...")
-            collected_files.sort()
+        return text_pairs
+    
+    def _load_scan_cache(self) -> dict:
+        """Загружает кэш проверки содержимого с прошлого запуска"""
+        try:
+            with open(self.scan_cache_file, 'rb') as f:
+                data = json_loads(f.read())
+        except (OSError, ValueError):
+            return {}
         
-        return collected_files
\ No newline at end of file
+        if not isinstance(data, dict) or data.get('version') != SCAN_CACHE_VERSION:
+            return {}
+        return data.get('files', {})
+    
+    def _save_scan_cache(self, files: dict):
+        """Сохраняет кэш проверки содержимого (ошибки записи не критичны)"""
+        try:
+            self.scan_cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.scan_cache_file, 'wb') as f:
+                f.write(json_dumps({'version': SCAN_CACHE_VERSION, 'files': files}))
+        except OSError:
+            pass
@@ -8,11 +8,25 @@ Config - структура настроек, ConfigManager - парсинг и
 
 import sys
 from dataclasses import dataclass
-from typing import Optional
-from codecollector.models import ProjectSettings
+from typing import Optional, TYPE_CHECKING
 
+if TYPE_CHECKING:
+    from codecollector.models import ProjectSettings
 
-@dataclass
+# slots=True поддерживается dataclass начиная с Python 3.10
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Результат всегда пишется в Markdown; имя файла можно переопределить
+# вторым позиционным аргументом
+DEFAULT_OUTPUT_FILE = "collected_files.md"
+
+# Группы CLI флагов для проверки "указан ли флаг явно"
+INTERACTIVE_FLAGS = frozenset({'-i', '--interactive'})
+SORT_FLAGS = frozenset({'-t', '--time', '--sort-time', '--no-time'})
+STRUCTURE_FLAGS = frozenset({'-s', '--structure', '--no-structure'})
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Config:
     """
     Структура конфигурации приложения
@@ -20,18 +34,41 @@ class Config:
     Атрибуты:
     - interactive: bool - использовать интерактивный выбор файлов
     - sort_by_time: bool - сортировать по времени изменения
-    - markdown_format: bool - использовать Markdown формат вывода
-    - show_structure: bool - показывать структуру проекта
+    - markdown_format: bool - вывод в Markdown (результат всегда Markdown, CLI флага нет)
+    - show_structure: bool - показывать структуру проекта (по умолчанию да)
     - source_dir: Optional[str] - исходная директория для сканирования
-    - output_file: Optional[str] - выходной файл
+    - output_file: str - выходной файл
     """
     interactive: bool = False
     sort_by_time: bool = False
-    markdown_format: bool = False
-    show_structure: bool = False
+    markdown_format: bool = True
+    show_structure: bool = True
     remote_mode: bool = False  # НОВОЕ ПОЛЕ
     source_dir: Optional[str] = None
-    output_file: Optional[str] = None
+    output_file: str = DEFAULT_OUTPUT_FILE
+
+
+def _set_field(field: str, value: bool):
+    """Создает обработчик CLI флага, выставляющий поле конфигурации"""
+    def handler(config: Config):
+        setattr(config, field, value)
+    return handler
+
+
+# Обработчики CLI флагов: один поиск в словаре на аргумент
+_FLAG_HANDLERS = {
+    '-i': _set_field('interactive', True),
+    '--interactive': _set_field('interactive', True),
+    '-t': _set_field('sort_by_time', True),
+    '--time': _set_field('sort_by_time', True),
+    '--sort-time': _set_field('sort_by_time', True),
+    '--no-time': _set_field('sort_by_time', False),
+    '-s': _set_field('show_structure', True),
+    '--structure': _set_field('show_structure', True),
+    '--no-structure': _set_field('show_structure', False),
+    '-r': _set_field('remote_mode', True),
+    '--remote': _set_field('remote_mode', True),
+}
 
 
 class ConfigManager:
@@ -50,40 +87,25 @@ class ConfigManager:
     def parse_cli_args() -> Config:
         """Парсит аргументы командной строки"""
         config = Config()
+        positional = []
         
-        i = 1
-        while i < len(sys.argv):
-            arg = sys.argv[i]
-            
-            if arg in ['-i', '--interactive']:
-                config.interactive = True
-            elif arg in ['-t', '--time', '--sort-time']:
-                config.sort_by_time = True
-            elif arg in ['--no-time']:
-                config.sort_by_time = False
-            elif arg in ['-m', '--markdown']:
-                config.markdown_format = True
-            elif arg in ['--no-markdown']:
-                config.markdown_format = False
-            elif arg in ['-s', '--structure']:
-                config.show_structure = True
-            elif arg in ['--no-structure']:
-                config.show_structure = False
-            elif arg in ['-r', '--remote']:  # НОВЫЙ ФЛАГ
-                config.remote_mode = True
+        for arg in sys.argv[1:]:
+            handler = _FLAG_HANDLERS.get(arg)
+            if handler is not None:
+                handler(config)
             elif not arg.startswith('-'):
-                # Позиционные аргументы
-                if config.source_dir is None:
-                    config.source_dir = arg
-                elif config.output_file is None:
-                    config.output_file = arg
-            
-            i += 1
+                positional.append(arg)
+        
+        # Позиционные аргументы: [директория] [выходной файл]
+        if positional:
+            config.source_dir = positional[0]
+        if len(positional) > 1:
+            config.output_file = positional[1]
         
         return config
     
     @staticmethod
-    def merge_with_saved_settings(config: Config, project_settings: ProjectSettings) -> Config:
+    def merge_with_saved_settings(config: Config, project_settings: 'ProjectSettings') -> Config:
         """Объединяет CLI конфигурацию с сохраненными настройками"""
         saved_settings = project_settings.load_settings()
         
@@ -94,50 +116,34 @@ class ConfigManager:
         print(f"🔄 Загружены настройки проекта '{saved_settings.get('project_name', 'Unknown')}'")
         
         # CLI флаги имеют приоритет над сохраненными настройками
-        if not any(arg in sys.argv for arg in ['-t', '--time', '--sort-time', '--no-time']):
+        argv = frozenset(sys.argv[1:])
+        if not SORT_FLAGS & argv:
             config.sort_by_time = saved_preferences.get('sort_by_time', config.sort_by_time)
         
-        if not any(arg in sys.argv for arg in ['-m', '--markdown', '--no-markdown']):
-            config.markdown_format = saved_preferences.get('markdown_format', config.markdown_format)
-        
-        if not any(arg in sys.argv for arg in ['-s', '--structure', '--no-structure']):
+        if not STRUCTURE_FLAGS & argv:
             config.show_structure = saved_preferences.get('show_structure', config.show_structure)
         
-        # Используем сохраненное имя файла если не задано
-        if not config.output_file:
-            config.output_file = saved_preferences.get('default_output')
-        
         return config
     
     @staticmethod
     def interactive_config_setup(config: Config, saved_settings_exist: bool = False) -> Config:
         """Интерактивная настройка конфигурации"""
-        # Определяем выходной файл
-        if not config.output_file:
-            default_ext = ".md" if config.markdown_format else ".txt"
-            default_output = f"collected_files{default_ext}"
-            
-            output_file = input(f"Введите имя выходного файла (по умолчанию '{default_output}'): ").strip()
-            config.output_file = output_file if output_file else default_output
+        argv = frozenset(sys.argv[1:])
         
         # Спрашиваем про интерактивный режим если не указан
-        if not config.interactive and '--interactive' not in sys.argv and '-i' not in sys.argv:
+        if not config.interactive and not INTERACTIVE_FLAGS & argv:
             choice = input("Использовать интерактивный выбор файлов? (y/N): ").strip().lower()
             config.interactive = choice in ['y', 'yes', 'д', 'да']
         
         # Если нет сохраненных настроек, спрашиваем про остальные опции
         if not saved_settings_exist:
-            if not any(arg in sys.argv for arg in ['-t', '--time', '--sort-time', '--no-time']):
+            if not SORT_FLAGS & argv:
                 choice = input("Сортировать по времени изменения (новые сверху)? (y/N): ").strip().lower()
                 config.sort_by_time = choice in ['y', 'yes', 'д', 'да']
             
-            if not any(arg in sys.argv for arg in ['-m', '--markdown', '--no-markdown']):
-                choice = input("Использовать Markdown формат? (y/N): ").strip().lower()
-                config.markdown_format = choice in ['y', 'yes', 'д', 'да']
-                
-                if config.markdown_format and not any(arg in sys.argv for arg in ['-s', '--structure', '--no-structure']):
-                    choice = input("Включить структуру проекта? (y/N): ").strip().lower()
-                    config.show_structure = choice in ['y', 'yes', 'д', 'да']
+            if not STRUCTURE_FLAGS & argv:
+                choice = input("Включить структуру проекта? (Y/n): ").strip().lower()
+                config.show_structure = choice not in ['n', 'no', 'н', 'нет']
         
         return config
     
@@ -9,15 +9,23 @@ CodeCollector - Инструмент для сбора файлов кода в
 import os
 import sys
 from pathlib import Path
-from typing import List
+from typing import FrozenSet, List, Optional, TYPE_CHECKING
 
 # Импорты модулей приложения
+# Сборщик, настройки проекта и ввод с клавиатуры импортируются там,
+# где нужны, чтобы `codecollector --help` не грузил их
 from codecollector.config import Config, ConfigManager
-from codecollector.models import ProjectSettings
-from codecollector.collector import CodeCollector
-from codecollector.selector import InteractiveSelector
-from codecollector.writers import MarkdownWriter
-from codecollector.utils import KeyboardHandler
+
+if TYPE_CHECKING:
+    from codecollector.collector import CodeCollector
+    from codecollector.models import ProjectSettings
+
+# Флаги запроса справки
+HELP_FLAGS = frozenset({'--help', '-h', 'help'})
+
+# Единицы для вывода размера результата
+_KB = 1 << 10
+_MB = 1 << 20
 
 
 class CodeCollectorApp:
@@ -29,37 +37,52 @@ class CodeCollectorApp:
     - config: Config - конфигурация приложения
     - project_settings: ProjectSettings - настройки проекта
     - collector: CodeCollector - сборщик файлов
+    - debug: bool - отладочный режим (--debug)
+    - args: FrozenSet[str] - аргументы командной строки (разобраны в main)
+    - view_state: Optional[dict] - состояние дерева после интерактивного выбора
     
     Методы:
     - run() -> int: Главный метод запуска приложения
-    - _determine_mode(saved_settings) -> str: Определяет режим работы
+    - _emit(*lines): Выводит строки статуса одной записью
+    - _determine_mode(saved_settings, args) -> str: Определяет режим работы
     - _get_source_directory() -> tuple: Получает исходную директорию
     - _validate_source_path(source_path, show_info) -> bool: Валидирует путь
     - _run_setup_wizard() -> Config: Мастер первоначальной настройки
     - _apply_quick_defaults() -> Config: Настройки для быстрого режима
     - _reset_project_settings(): Сбрасывает настройки проекта
+    - _scan_files() -> List[Path]: Сканирует проект, показывая ход сканирования
     - _interactive_file_selection(files, root_path) -> List[Path]: Интерактивный выбор
+    - _get_settings_string() -> str: Строка активных настроек проекта
     - _save_user_preferences(selected_files): Сохраняет настройки
-    - _write_output(files, root_path): Записывает результат
+    - _write_output(files, root_path) -> int: Записывает результат, возвращает размер
     """
     
-    def __init__(self):
+    def __init__(self, debug: bool = False, args: Optional[FrozenSet[str]] = None):
         self.config: Config = None
-        self.project_settings: ProjectSettings = None
-        self.collector: CodeCollector = None
+        self.project_settings: 'ProjectSettings' = None
+        self.collector: 'CodeCollector' = None
+        self.debug = debug
+        # Аргументы, уже разобранные в множество (без main - из sys.argv)
+        self.args = args if args is not None else frozenset(sys.argv[1:])
+        # Состояние дерева после интерактивного выбора (сохраняется в настройках)
+        self.view_state: Optional[dict] = None
         
     def run(self) -> int:
         """Запускает приложение с упрощенной логикой"""
+        from codecollector.models import ProjectSettings
+        from codecollector.collector import CodeCollector
+        
         try:
-            print("🚀 CodeCollector")
-            print("=" * 30)
+            self._emit("🚀 CodeCollector", "=" * 30)
             
             # 1. КОНФИГУРАЦИЯ
             self.config = ConfigManager.parse_cli_args()
             
             # Определяем рабочую директорию
             source_dir, showed_prompt = self._get_source_directory()
-            source_path = Path(source_dir)
+            # Путь разрешается один раз: сборщик, настройки и writer
+            # получают один и тот же абсолютный Path
+            source_path = Path(source_dir).resolve()
             
             if not self._validate_source_path(source_path, not showed_prompt):
                 return 1
@@ -69,7 +92,7 @@ class CodeCollectorApp:
             saved_settings = self.project_settings.load_settings()
             
             # ОПРЕДЕЛЯЕМ РЕЖИМ РАБОТЫ
-            mode = self._determine_mode(saved_settings)
+            mode = self._determine_mode(saved_settings, self.args)
             
             if mode == "FORCE_SETUP":
                 # codecollector --setup
@@ -87,31 +110,19 @@ class CodeCollectorApp:
             elif mode == "QUICK_RUN":
                 # ЕСТЬ НАСТРОЙКИ - СРАЗУ В ДЕРЕВО!
                 self.config = ConfigManager.merge_with_saved_settings(self.config, self.project_settings)
-                print(f"🔄 Проект '{saved_settings.get('project_name')}' | ", end="")
+                
+                self.config.interactive = bool(saved_settings.get('preferences', {}).get('interactive_mode', True))
                 
                 # Показываем активные настройки одной строкой
-                flags = []
-                if self.config.sort_by_time:
-                    flags.append("по времени")
-                else:
-                    flags.append("по имени")
-                    
-                if saved_settings.get('preferences', {}).get('interactive_mode', True):
-                    flags.append("интерактивный")
-                    self.config.interactive = True
-                else:
-                    flags.append("все файлы")
-                    self.config.interactive = False
-                    
-                print(" + ".join(flags))
+                self._emit(f"🔄 Проект '{saved_settings.get('project_name')}' | {self._get_settings_string()}")
                 
             else:
                 # mode == "FIRST_TIME_SETUP"  
                 self.config = self._run_setup_wizard()
             
             # 2. СБОР ФАЙЛОВ
-            self.collector = CodeCollector(source_path, self.config)
-            collected_files = self.collector.scan_and_collect()
+            self.collector = CodeCollector(source_path, self.config, debug=self.debug)
+            collected_files = self._scan_files()
             
             if not collected_files:
                 print("❌ Нет файлов для обработки!")
@@ -126,30 +137,21 @@ class CodeCollectorApp:
                     return 0
                 collected_files = selected_files
             
-            # 4. ЗАПИСЬ РЕЗУЛЬТАТА (жестко collected_files.md)
-            self.config.output_file = "collected_files.md"
-            self.config.markdown_format = True
-            self.config.show_structure = True
-            self._write_output(collected_files, source_path)
+            # 4. ЗАПИСЬ РЕЗУЛЬТАТА (Markdown, по умолчанию collected_files.md)
+            file_size = self._write_output(collected_files, source_path)
             
             # 5. СОХРАНЕНИЕ НАСТРОЕК
             self._save_user_preferences(collected_files)
             
             # 6. УСПЕШНОЕ ЗАВЕРШЕНИЕ
-            print(f"✅ Готово! → collected_files.md")
-            
-            # Показываем размер файла
-            try:
-                file_size = Path("collected_files.md").stat().st_size
-                if file_size > 1024 * 1024:
-                    size_str = f"{file_size / (1024 * 1024):.1f} MB"
-                elif file_size > 1024:
-                    size_str = f"{file_size / 1024:.1f} KB"
-                else:
-                    size_str = f"{file_size} bytes"
-                print(f"📊 Размер: {size_str}")
-            except:
-                pass
+            # Размер файла вернул writer, повторный stat не нужен
+            if file_size > _MB:
+                size_str = f"{file_size / _MB:.1f} MB"
+            elif file_size > _KB:
+                size_str = f"{file_size / _KB:.1f} KB"
+            else:
+                size_str = f"{file_size} bytes"
+            self._emit(f"✅ Готово! → {self.config.output_file}", f"📊 Размер: {size_str}")
             
             return 0
             
@@ -158,18 +160,24 @@ class CodeCollectorApp:
             return 1
         except Exception as e:
             print(f"❌ Ошибка: {e}")
-            if "--debug" in sys.argv:
+            if self.debug:
                 import traceback
                 traceback.print_exc()
             return 1
     
-    def _determine_mode(self, saved_settings) -> str:
-        """Определяет режим работы приложения"""
-        if '--setup' in sys.argv:
+    @staticmethod
+    def _emit(*lines: str):
+        """Выводит несколько строк статуса одной записью в stdout"""
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+    
+    def _determine_mode(self, saved_settings, args: FrozenSet[str]) -> str:
+        """Определяет режим работы приложения по флагам из args"""
+        if '--setup' in args:
             return "FORCE_SETUP"
-        elif '--quick' in sys.argv:
+        elif '--quick' in args:
             return "FORCE_QUICK"  
-        elif '--reset' in sys.argv:
+        elif '--reset' in args:
             return "RESET_AND_SETUP"
         elif saved_settings:
             return "QUICK_RUN"  # ЕСТЬ НАСТРОЙКИ = СРАЗУ РАБОТАТЬ
@@ -210,6 +218,8 @@ class CodeCollectorApp:
     
     def _run_setup_wizard(self) -> Config:
         """Запускает мастер настройки (только для первого раза или --setup)"""
+        from codecollector.utils import KeyboardHandler
+        
         print("🔧 Настройка проекта...")
         
         # Сортировка
@@ -240,8 +250,6 @@ class CodeCollectorApp:
         print("⚡ Быстрый режим - все файлы")
         self.config.sort_by_time = False
         self.config.interactive = False
-        self.config.markdown_format = True
-        self.config.show_structure = True
         return self.config
     
     def _reset_project_settings(self):
@@ -250,13 +258,42 @@ class CodeCollectorApp:
         if settings_file.exists():
             settings_file.unlink()
             print("🗑️  Настройки проекта удалены")
+        self.project_settings.invalidate_cache()
+    
+    def _scan_files(self) -> List[Path]:
+        """
+        Сканирует проект. На больших деревьях обход заметно долгий, поэтому
+        в терминале строка статуса показывает число уже найденных файлов
+        """
+        # В отладочном режиме сборщик сам печатает сводку
+        if self.debug or not sys.stdout.isatty():
+            return self.collector.scan_and_collect()
+        
+        shown = False
+        
+        def report(count: int):
+            nonlocal shown
+            shown = True
+            sys.stdout.write(f"\r🔍 Сканирование... найдено файлов: {count}")
+            sys.stdout.flush()
+        
+        try:
+            return self.collector.scan_and_collect(report)
+        finally:
+            if shown:
+                # Стираем строку статуса
+                sys.stdout.write("\r\x1b[K")
+                sys.stdout.flush()
     
     def _interactive_file_selection(self, files: List[Path], root_path: Path) -> List[Path]:
         """Выполняет интерактивный выбор с сохранением контекста"""
+        # Селектор нужен только в интерактивном режиме
+        from codecollector.selector import InteractiveSelector
         
         # Загружаем сохраненный выбор
         saved_files = []
         saved_folders = []
+        view_state = None
         
         settings = self.project_settings.load_settings()
         if settings:
@@ -264,6 +301,7 @@ class CodeCollectorApp:
                 settings.get('selected_files', []),
                 settings.get('selected_folders', [])
             )
+            view_state = settings.get('view_state')
         
         # Подготавливаем информацию о проекте для отображения
         project_info = {
@@ -272,8 +310,9 @@ class CodeCollectorApp:
         }
         
         # Запускаем селектор с контекстом проекта
-        selector = InteractiveSelector(files, root_path, saved_files, saved_folders, project_info)
+        selector = InteractiveSelector(files, root_path, saved_files, saved_folders, project_info, view_state)
         selected_files = selector.run()
+        self.view_state = selector.get_view_state()
         
         return selected_files
     
@@ -300,16 +339,18 @@ class CodeCollectorApp:
         preferences = {
             'interactive_mode': self.config.interactive,
             'sort_by_time': self.config.sort_by_time,
-            'markdown_format': self.config.markdown_format,
             'show_structure': self.config.show_structure,
         }
         
-        self.project_settings.save_settings(preferences, selected_files, selected_folders_paths)
+        self.project_settings.save_settings(preferences, selected_files, selected_folders_paths,
+                                            self.view_state, self.collector.gitignore_patterns)
     
-    def _write_output(self, files: List[Path], root_path: Path):
-        """Записывает результат в выходной файл (всегда Markdown)"""
-        writer = MarkdownWriter(root_path, self.config.show_structure)
-        writer.write(files, self.config.output_file)
+    def _write_output(self, files: List[Path], root_path: Path) -> int:
+        """Записывает результат в выходной файл (всегда Markdown), возвращает размер в байтах"""
+        from codecollector.writers import MarkdownWriter
+        
+        writer = MarkdownWriter(root_path, self.config.show_structure, self.collector.file_contents)
+        return writer.write(files, self.config.output_file)
 
 
 def show_help():
@@ -318,13 +359,14 @@ def show_help():
 🚀 CodeCollector - Инструмент для сбора файлов кода в один документ
 
 ИСПОЛЬЗОВАНИЕ:
-  codecollector [ОПЦИИ] [ДИРЕКТОРИЯ]
+  codecollector [ОПЦИИ] [ДИРЕКТОРИЯ] [ВЫХОДНОЙ_ФАЙЛ]
 
 ОПЦИИ:
   -r, --remote         Удаленный режим: спросить директорию для сканирования
   --setup              Принудительная настройка проекта заново
   --quick              Быстрый режим: все файлы без интерактивного выбора
   --reset              Сбросить настройки проекта и настроить заново
+  --no-structure       Не включать структуру проекта в результат
   
   --help, -h           Показать эту справку
   --debug              Включить отладочный режим
@@ -347,6 +389,7 @@ def show_help():
   A/N - выбрать всё/ничего
   +/- - развернуть/свернуть все папки
   R - сбросить весь выбор
+  U - вернуть выбор до последнего A/N/R
   Q/ESC - выход
   ENTER - подтвердить выбор
 
@@ -354,6 +397,8 @@ def show_help():
   Настройки сохраняются в .codecollector/<имя_проекта>.json
   Включают предпочтения пользователя и последний выбор файлов
   Автоматически добавляется в .gitignore
+  Кэш проверки файлов на бинарность: .codecollector/cache/scan.json
+  (записывается при каждом сборе, в том числе с --quick)
 
 ФИЛЬТРАЦИЯ:
   • Учитывает .gitignore файлы
@@ -362,7 +407,7 @@ def show_help():
   • Игнорирует пустые файлы и бинарные данные
 
 ФОРМАТ ВЫВОДА:
-  • Всегда: collected_files.md в Markdown формате
+  • Markdown формат, по умолчанию файл collected_files.md
   • Подсветка синтаксиса для всех популярных языков
   • Структура проекта в виде дерева
   • Заголовки с путями к файлам
@@ -372,13 +417,16 @@ def show_help():
 
 def main():
     """Главная функция - точка входа в приложение"""
+    # Аргументы разбираем в множество один раз
+    args = frozenset(sys.argv[1:])
+    
     # Проверяем запрос справки
-    if any(arg in sys.argv for arg in ['--help', '-h', 'help']):
+    if HELP_FLAGS & args:
         show_help()
         return 0
     
     # Запускаем приложение
-    app = CodeCollectorApp()
+    app = CodeCollectorApp(debug='--debug' in args, args=args)
     return app.run()
 
 
@@ -6,10 +6,26 @@
 TreeNode - узел дерева файлов, ProjectSettings - настройки проекта
 """
 
-import json
-import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from stat import S_ISDIR, S_ISREG
 from typing import List, Optional
+from codecollector.utils import json_dumps, json_loads
+
+# С какого количества сохраненных путей проверять их в пуле потоков
+PARALLEL_STAT_THRESHOLD = 64
+
+# Запись .gitignore для папки настроек и варианты, которые ее уже исключают
+GITIGNORE_ENTRY = '.codecollector/'
+GITIGNORE_ENTRIES = frozenset({GITIGNORE_ENTRY, '.codecollector'})
+# Те же записи как целые строки (в байтах) для поиска в содержимом файла
+_GITIGNORE_LINE_MARKERS = tuple(b'\n' + entry.encode('utf-8') + b'\n'
+                                for entry in GITIGNORE_ENTRIES)
+
+# Маркер "настройки еще не загружались" (None - уже загружены, но их нет)
+_UNSET = object()
 
 
 class TreeNode:
@@ -30,64 +46,237 @@ class TreeNode:
     - set_selected_recursive(selected): Устанавливает выбор рекурсивно
     - get_display_name() -> str: Возвращает отображаемое имя
     - get_file_count() -> int: Подсчитывает файлы в ветке
+    - cache_file_counts() -> int: Запоминает число файлов во всех папках ветки
     - get_selected_files() -> List[Path]: Возвращает выбранные файлы
+    - get_selected_nodes() -> List[TreeNode]: Возвращает узлы выбранных файлов
     """
     
+    # Узел создается на каждый файл и папку - без __dict__ он заметно компактнее
+    __slots__ = ('path', 'is_file', 'parent', 'children', '_selected',
+                 '_selection_state', '_pending_selection', 'expanded', 'visible',
+                 '_display_name', '_file_count', '_full_selection_state')
+    
     def __init__(self, path, is_file=True, parent=None):
         self.path = path
         self.is_file = is_file
         self.parent = parent
         self.children = [] if not is_file else None
-        self.selected = False
+        self._selected = False
+        # Кэш get_selection_state для папок (None - нужно пересчитать)
+        self._selection_state = None
+        # Выбор папки, еще не опущенный к детям (None - нет отложенного выбора)
+        self._pending_selection = None
         self.expanded = not is_file  # Файлы всегда "развернуты"
         self.visible = True
+        # Число файлов в ветке, посчитанное cache_file_counts (None - не считалось)
+        self._file_count = 1 if is_file else None
+        # Состояние ветки, когда выбраны все ее файлы (cache_file_counts, None - не считалось)
+        self._full_selection_state = 'all' if is_file else None
+        # Имя для отображения считается один раз, а не при каждой перерисовке
+        if parent is None:
+            self._display_name = str(path.name) if path.name else str(path)
+        else:
+            self._display_name = path.name
+    
+    @property
+    def selected(self):
+        """Выбран ли файл"""
+        self._apply_pending_selection()
+        return self._selected
+    
+    @selected.setter
+    def selected(self, value):
+        self._apply_pending_selection()
+        if self._selected != value:
+            self._selected = value
+            self._invalidate_selection()
+    
+    def _apply_pending_selection(self):
+        """
+        Опускает отложенный выбор папок-предков до узла. Выбор спускается
+        только по пути к узлу, на каждом уровне - к детям одной папки
+        """
+        path = []
+        has_pending = False
+        node = self.parent
+        while node is not None:
+            path.append(node)
+            if node._pending_selection is not None:
+                has_pending = True
+            node = node.parent
+        
+        if has_pending:
+            # Сверху вниз: выбор верхней папки новее выбора папок под ней
+            for node in reversed(path):
+                if node._pending_selection is not None:
+                    node._push_selection()
+    
+    def _push_selection(self):
+        """Передает отложенный выбор папки ее детям (на один уровень)"""
+        selected = self._pending_selection
+        self._pending_selection = None
+        for child in self.children:
+            if child.is_file:
+                child._selected = selected
+            else:
+                child._pending_selection = selected
+                child._selection_state = child._get_full_selection_state() if selected else 'none'
+    
+    def _invalidate_selection(self):
+        """Сбрасывает кэш состояния выбора у всех папок-предков"""
+        # Если кэш папки уже сброшен, то и у ее предков тоже:
+        # состояние папки всегда считается через состояния всех детей
+        node = self.parent
+        while node is not None and node._selection_state is not None:
+            node._selection_state = None
+            node = node.parent
         
     def get_selection_state(self):
         """Возвращает состояние выбора: 'all', 'none', 'partial'"""
+        self._apply_pending_selection()
+        return self._get_selection_state()
+    
+    def _get_selection_state(self):
+        """Состояние выбора узла, у предков которого нет отложенного выбора"""
         if self.is_file:
-            return 'all' if self.selected else 'none'
+            return 'all' if self._selected else 'none'
+        
+        # У папки с отложенным выбором состояние всегда посчитано
+        if self._selection_state is None:
+            # Обход явным стеком только по папкам без кэша; считаем снизу
+            # вверх, так что у детей каждой папки состояние уже есть
+            folders = []
+            stack = [self]
+            while stack:
+                folder = stack.pop()
+                folders.append(folder)
+                stack.extend(child for child in folder.children
+                             if not child.is_file and child._selection_state is None)
+            for folder in reversed(folders):
+                folder._selection_state = folder._compute_selection_state()
+        return self._selection_state
+    
+    def _compute_selection_state(self):
+        """Считает состояние папки по состояниям детей (у папок-детей оно уже посчитано)"""
+        return self._combine_states(child._get_selection_state() for child in self.children)
+    
+    def _get_full_selection_state(self):
+        """
+        Состояние узла, когда выбраны все файлы ветки: 'all', но пустые
+        папки остаются 'none', как и при выборе файлов по одному
+        """
+        if self._full_selection_state is not None:
+            return self._full_selection_state
         
-        if not self.children:
-            return 'none'
+        # Не посчитано заранее (cache_file_counts) - считаем снизу вверх без запоминания
+        folders = self._collect_folders()
+        states = {}
+        for folder in reversed(folders):
+            states[folder] = self._combine_states(
+                'all' if child.is_file else states[child] for child in folder.children)
+        return states[self]
+    
+    @staticmethod
+    def _combine_states(states):
+        """Состояние папки по состояниям ее детей"""
+        has_all = has_none = False
+        for state in states:
+            if state == 'all':
+                has_all = True
+            elif state == 'none':
+                has_none = True
+            else:
+                return 'partial'
             
-        selected_count = sum(1 for child in self.children 
-                           if child.get_selection_state() in ['all', 'partial'])
+            if has_all and has_none:
+                return 'partial'
         
-        if selected_count == 0:
-            return 'none'
-        elif selected_count == len(self.children):
-            return 'all'
-        else:
-            return 'partial'
+        # Пустая папка - 'none'
+        return 'all' if has_all else 'none'
     
     def set_selected_recursive(self, selected):
-        """Устанавливает выбор рекурсивно"""
+        """
+        Устанавливает выбор рекурсивно. Для папки выбор откладывается:
+        дети получают его при первом обращении к ним (см. _push_selection),
+        так что выбор большой свернутой папки не обходит ее содержимое
+        """
         if self.is_file:
             self.selected = selected
-        else:
-            for child in self.children:
-                child.set_selected_recursive(selected)
+            return
+        
+        self._apply_pending_selection()
+        self._pending_selection = selected
+        self._selection_state = self._get_full_selection_state() if selected else 'none'
+        self._invalidate_selection()
     
     def get_display_name(self):
         """Возвращает отображаемое имя"""
-        if self.parent is None:
-            return str(self.path.name) if self.path.name else str(self.path)
-        return self.path.name
+        return self._display_name
     
     def get_file_count(self):
         """Возвращает количество файлов в папке"""
-        if self.is_file:
-            return 1
-        return sum(child.get_file_count() for child in self.children)
+        if self._file_count is not None:
+            return self._file_count
+        
+        # Обход явным стеком: без рекурсивных вызовов на каждый узел
+        count = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.is_file:
+                count += 1
+            else:
+                stack.extend(node.children)
+        return count
+    
+    def cache_file_counts(self):
+        """
+        Считает файлы во всех папках ветки одним проходом (снизу вверх)
+        и запоминает результат (вместе с состоянием ветки при выборе всех
+        файлов). Вызывается после построения дерева: состав файлов дальше
+        не меняется
+        """
+        folders = self._collect_folders()
+        for folder in reversed(folders):
+            folder._file_count = sum(child._file_count for child in folder.children)
+            folder._full_selection_state = self._combine_states(
+                child._full_selection_state for child in folder.children)
+        return self._file_count
+    
+    def _collect_folders(self):
+        """Папки ветки в порядке обхода в глубину: в обратном порядке дети идут раньше родителей"""
+        folders = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if not node.is_file:
+                folders.append(node)
+                stack.extend(node.children)
+        return folders
     
     def get_selected_files(self):
         """Возвращает список выбранных файлов"""
-        if self.is_file:
-            return [self.path] if self.selected else []
+        return [node.path for node in self.get_selected_nodes()]
+    
+    def get_selected_nodes(self):
+        """Возвращает список узлов выбранных файлов в порядке дерева"""
+        self._apply_pending_selection()
         
+        # Дети кладутся в стек в обратном порядке, чтобы сохранить порядок дерева.
+        # Отложенный выбор папки действует на всю ветку без спуска его к детям
         result = []
-        for child in self.children:
-            result.extend(child.get_selected_files())
+        stack = [(self, None)]
+        while stack:
+            node, forced = stack.pop()
+            if node.is_file:
+                if node._selected if forced is None else forced:
+                    result.append(node)
+                continue
+            
+            if forced is None:
+                forced = node._pending_selection
+            if forced is not False:
+                stack.extend((child, forced) for child in reversed(node.children))
         return result
 
 
@@ -103,118 +292,181 @@ class ProjectSettings:
     - settings_file: Path - файл настроек
     
     Методы:
-    - load_settings() -> Optional[dict]: Загружает настройки проекта
-    - save_settings(preferences, selected_files, selected_folders): Сохраняет настройки
+    - load_settings() -> Optional[dict]: Загружает настройки проекта (кэшируется)
+    - invalidate_cache(): Сбрасывает кэш загруженных настроек
+    - save_settings(preferences, selected_files, selected_folders, view_state, gitignore_patterns): Сохраняет настройки
     - filter_existing_paths(files, folders) -> Tuple: Фильтрует существующие пути
-    - _update_gitignore(): Добавляет .codecollector в .gitignore
+    - _probe_path(rel_path) -> Tuple: Путь и его st_mode (один stat)
+    - _relative_paths(paths) -> List[str]: Относительные пути проекта через '/'
+    - _update_gitignore(gitignore_patterns): Добавляет .codecollector в .gitignore
     """
     
     def __init__(self, root_path):
-        self.root_path = Path(root_path).resolve()
+        # Уже абсолютный Path (приложение разрешает путь заранее) не разрешаем повторно
+        if isinstance(root_path, Path) and root_path.is_absolute():
+            self.root_path = root_path
+        else:
+            self.root_path = Path(root_path).resolve()
         self.settings_dir = self.root_path / ".codecollector"
         self.project_name = self.root_path.name
         self.settings_file = self.settings_dir / f"{self.project_name}.json"
+        # Результат load_settings: за время запуска файл меняем только мы сами
+        self._cached_settings = _UNSET
+        # Папка настроек уже создана этим экземпляром
+        self._dir_created = False
         
     def load_settings(self) -> Optional[dict]:
-        """Загружает настройки проекта"""
+        """Загружает настройки проекта (файл читается один раз за запуск)"""
+        if self._cached_settings is _UNSET:
+            self._cached_settings = self._read_settings()
+        return self._cached_settings
+    
+    def invalidate_cache(self):
+        """Сбрасывает кэш настроек (после записи или удаления файла)"""
+        self._cached_settings = _UNSET
+    
+    def _read_settings(self) -> Optional[dict]:
+        """Читает и проверяет файл настроек"""
         if not self.settings_file.exists():
             return None
             
         try:
-            with open(self.settings_file, 'r', encoding='utf-8') as f:
-                settings = json.load(f)
+            with open(self.settings_file, 'rb') as f:
+                settings = json_loads(f.read())
                 
             # Проверяем актуальность пути
             if settings.get('full_path') != str(self.root_path):
                 return None
                 
             return settings
-        except (json.JSONDecodeError, OSError) as e:
+        except (ValueError, OSError) as e:
             print(f"⚠️  Предупреждение: Не удалось загрузить настройки проекта: {e}")
             return None
     
-    def save_settings(self, preferences: dict, selected_files: List[Path], selected_folders: List[Path]):
-        """Сохраняет настройки проекта"""
+    def save_settings(self, preferences: dict, selected_files: List[Path], selected_folders: List[Path],
+                      view_state: Optional[dict] = None, gitignore_patterns: Optional[List[str]] = None):
+        """
+        Сохраняет настройки проекта. view_state - состояние дерева
+        интерактивного выбора; если не передано, сохраняется прежнее.
+        gitignore_patterns - уже прочитанные паттерны .gitignore проекта
+        (тогда файл не перечитывается, если запись в нем уже есть)
+        """
         try:
-            # Создаем папку если не существует
-            self.settings_dir.mkdir(exist_ok=True)
-            
-            # Конвертируем пути в относительные строки
-            selected_files_rel = []
-            selected_folders_rel = []
-            
-            for file_path in selected_files:
-                try:
-                    rel_path = file_path.relative_to(self.root_path)
-                    selected_files_rel.append(str(rel_path).replace('\\', '/'))
-                except ValueError:
-                    continue
+            # Создаем папку если не существует (один раз на экземпляр)
+            if not self._dir_created:
+                self.settings_dir.mkdir(exist_ok=True)
+                self._dir_created = True
             
-            for folder_path in selected_folders:
-                try:
-                    rel_path = folder_path.relative_to(self.root_path)
-                    selected_folders_rel.append(str(rel_path).replace('\\', '/'))
-                except ValueError:
-                    continue
+            # Конвертируем пути в относительные строки (через '/')
+            selected_files_rel = self._relative_paths(selected_files)
+            selected_folders_rel = self._relative_paths(selected_folders)
             
             settings = {
                 "project_name": self.project_name,
                 "full_path": str(self.root_path),
-                "last_updated": datetime.datetime.now().isoformat(),
+                "last_updated": time.time(),  # Unix time, секунды
                 "preferences": preferences,
                 "selected_files": selected_files_rel,
                 "selected_folders": selected_folders_rel
             }
             
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
+            if view_state is None:
+                previous = self.load_settings()
+                view_state = previous.get('view_state') if previous else None
+            if view_state is not None:
+                settings["view_state"] = view_state
+            
+            with open(self.settings_file, 'wb') as f:
+                f.write(json_dumps(settings, indent=True))
+            self.invalidate_cache()
                 
             print("💾 Настройки проекта сохранены")
             
             # Добавляем в .gitignore если нужно
-            self._update_gitignore()
+            self._update_gitignore(gitignore_patterns)
             
         except Exception as e:
             print(f"⚠️  Предупреждение: Не удалось сохранить настройки: {e}")
     
-    def _update_gitignore(self):
+    def _relative_paths(self, paths: List[Path]) -> List[str]:
+        """Переводит пути внутри проекта в относительные строки, остальные пропускает"""
+        # Пути приходят от сборщика от того же разрешенного корня,
+        # поэтому достаточно отрезать строковый префикс
+        root_prefix = str(self.root_path)
+        if not root_prefix.endswith(os.sep):
+            root_prefix += os.sep
+        prefix_len = len(root_prefix)
+        
+        # Разделитель меняем только там, где он не '/' (как Path.as_posix):
+        # на POSIX обратный слеш - допустимый символ имени файла
+        native_sep = os.sep if os.sep != '/' else None
+        
+        result = []
+        for path in paths:
+            path_str = str(path)
+            if path_str.startswith(root_prefix):
+                rel_path = path_str[prefix_len:]
+                if native_sep:
+                    rel_path = rel_path.replace(native_sep, '/')
+                result.append(rel_path)
+        return result
+    
+    def _update_gitignore(self, gitignore_patterns: Optional[List[str]] = None):
         """Добавляет .codecollector в .gitignore если нужно"""
+        # Запись уже есть среди прочитанных сборщиком паттернов - файл не читаем
+        if gitignore_patterns is not None and not GITIGNORE_ENTRIES.isdisjoint(gitignore_patterns):
+            return
+        
         gitignore_path = self.root_path / '.gitignore'
-        gitignore_entry = '.codecollector/'
         
         try:
-            # Читаем существующий .gitignore
-            existing_lines = []
-            if gitignore_path.exists():
-                with open(gitignore_path, 'r', encoding='utf-8') as f:
-                    existing_lines = f.read().splitlines()
-            
-            # Проверяем, есть ли уже запись
-            if gitignore_entry not in existing_lines and '.codecollector' not in existing_lines:
-                with open(gitignore_path, 'a', encoding='utf-8') as f:
-                    if existing_lines and not existing_lines[-1].strip():
-                        f.write(f"{gitignore_entry}\n")
-                    else:
-                        f.write(f"\n{gitignore_entry}\n")
+            # Один дескриптор на чтение и дозапись ('a+' создаст файл при отсутствии)
+            with open(gitignore_path, 'a+b') as f:
+                f.seek(0)
+                data = f.read()
+                
+                # Проверяем, есть ли уже запись: поиск целой строки по байтам,
+                # без разбиения файла на список строк
+                framed = b'\n' + data.replace(b'\r', b'\n') + b'\n'
+                if any(marker in framed for marker in _GITIGNORE_LINE_MARKERS):
+                    return
+                
+                separator = b'' if not data or data.endswith(b'\n') else b'\n'
+                f.write(separator + GITIGNORE_ENTRY.encode('utf-8') + b'\n')
                         
         except Exception:
             pass  # Игнорируем ошибки с .gitignore
     
     def filter_existing_paths(self, selected_files: List[str], selected_folders: List[str]) -> tuple:
         """Фильтрует существующие пути из сохраненных настроек"""
-        existing_files = []
-        existing_folders = []
+        rel_paths = list(selected_files) + list(selected_folders)
+        
+        # Один stat на путь вместо exists() + is_file()/is_dir().
+        # На сетевых дисках stat упирается в задержку, поэтому
+        # большие списки проверяются в пуле потоков
+        if len(rel_paths) < PARALLEL_STAT_THRESHOLD:
+            probes = [self._probe_path(rel_path_str) for rel_path_str in rel_paths]
+        else:
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                probes = list(executor.map(self._probe_path, rel_paths))
+        
+        files_count = len(selected_files)
         
         # Проверяем файлы
-        for rel_path_str in selected_files:
-            abs_path = self.root_path / rel_path_str
-            if abs_path.exists() and abs_path.is_file():
-                existing_files.append(abs_path)
+        existing_files = [abs_path for abs_path, mode in probes[:files_count]
+                          if mode is not None and S_ISREG(mode)]
         
         # Проверяем папки
-        for rel_path_str in selected_folders:
-            abs_path = self.root_path / rel_path_str
-            if abs_path.exists() and abs_path.is_dir():
-                existing_folders.append(abs_path)
+        existing_folders = [abs_path for abs_path, mode in probes[files_count:]
+                            if mode is not None and S_ISDIR(mode)]
         
-        return existing_files, existing_folders
\ No newline at end of file
+        return existing_files, existing_folders
+    
+    def _probe_path(self, rel_path_str: str) -> tuple:
+        """Возвращает (абсолютный путь, st_mode) или (путь, None), если пути нет"""
+        abs_path = self.root_path / rel_path_str
+        try:
+            return abs_path, os.stat(abs_path).st_mode
+        except (OSError, ValueError):
+            return abs_path, None
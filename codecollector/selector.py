@@ -6,10 +6,36 @@
 """
 
 import os
+import sys
+import shutil
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, Iterator, List, Set, Tuple, Optional
 from codecollector.models import TreeNode
-from codecollector.utils import KeyboardHandler
+from codecollector.utils import KeyboardHandler, enable_ansi_escapes
+
+# ANSI: очистка экрана с курсором в начало и очистка до конца строки
+ANSI_CLEAR_SCREEN = "\x1b[2J\x1b[H"
+ANSI_CLEAR_LINE = "\x1b[K"
+# ANSI: переход на отдельный экран терминала и возврат (как у less и vim)
+ANSI_ALT_SCREEN_ON = "\x1b[?1049h"
+ANSI_ALT_SCREEN_OFF = "\x1b[?1049l"
+
+# Клавиши, которые только двигают курсор и не меняют дерево
+NAVIGATION_KEYS = frozenset({'UP', 'DOWN', 'PAGEUP', 'PAGEDOWN'})
+
+# Рамка шапки дерева: неизменные строки собираются один раз при загрузке модуля,
+# строки со статистикой подставляются в шаблон
+BOX_TOP = "╔" + "═" * 80 + "╗"
+BOX_SEPARATOR = "╠" + "═" * 80 + "╣"
+BOX_BOTTOM = "╚" + "═" * 80 + "╝"
+BOX_ROW = "║{:<78}║"
+BOX_HELP = (
+    BOX_ROW.format("  ↑↓ - навигация, SPACE - выбор, →← - раскрыть/свернуть, F - поиск, Q - выход"),
+    BOX_ROW.format("  A/N - всё/ничего, R - сброс, U - откат A/N/R, +/- - развернуть/свернуть все"),
+)
+
+# Сколько уже накопившихся нажатий обработать до перерисовки
+MAX_COALESCED_KEYS = 32
 
 
 class InteractiveSelector:
@@ -20,19 +46,113 @@ class InteractiveSelector:
     def __init__(self, files: List[Path], root_path: Path, 
                  saved_files: Optional[List[Path]] = None, 
                  saved_folders: Optional[List[Path]] = None,
-                 project_info: Optional[dict] = None):
+                 project_info: Optional[dict] = None,
+                 view_state: Optional[dict] = None):
         self.files = files
         self.root_path = root_path
+        # Префикс корня для получения относительных путей срезом строки
+        root_str = str(root_path)
+        self._root_prefix = root_str if root_str.endswith(os.sep) else root_str + os.sep
         self.tree_root = self._build_file_tree()
         self.current_pos = 0
         self.page_size = 15  # Уменьшили чтобы влезал контекст
         self.current_page = 0
         self.search_term = ""
+        # Режим набора строки поиска: клавиши добавляют символы в search_term
+        self._search_mode = False
+        # Видимые при поиске узлы: найденные файлы и их папки (None - поиска нет)
+        self._search_matches: Optional[Set[TreeNode]] = None
+        # Индекс для поиска: файлы и их имена в нижнем регистре, по одному списку
+        self._flat_files: List[TreeNode] = []
+        self._flat_names_lower: List[str] = []
+        # Позиция файла в _flat_files - индекс его флага в снимке выбора
+        self._file_positions: Dict[TreeNode, int] = {}
+        self._build_search_index()
         self.project_info = project_info or {}
+        # Кэши для перерисовки: сбрасываются только при изменении дерева,
+        # навигация курсором их не трогает
+        # Видимые узлы (узел, глубина) в порядке отображения (None - построить заново).
+        # Раскрытие или сворачивание одной папки правит список на месте
+        self._visible_nodes: Optional[List[Tuple[TreeNode, int]]] = None
+        self._stats_cache: Optional[Tuple[int, int]] = None
+        # Отформатированные неизменяемые части строк узлов (см. _get_row_label)
+        self._row_labels: Dict[TreeNode, Tuple[str, str]] = {}
+        # Последний выведенный кадр (None - экран нужно перерисовать целиком)
+        self._last_frame: Optional[List[str]] = None
+        # Выбор до последнего A/N/R - клавиша U возвращает его (None - нечего возвращать).
+        # Байт на файл в порядке _flat_files: 1 - файл был выбран
+        self._selection_undo: Optional[bytearray] = None
+        self._ansi = enable_ansi_escapes()
+        # Выбор идет на отдельном экране терминала (только ANSI-терминал)
+        self._alt_screen = self._ansi and sys.stdout.isatty()
+        # Выбор отменен (Q/ESC) - сообщение выводится после возврата экрана
+        self._cancelled = False
         
         # Применяем сохраненный выбор если есть
         if saved_files or saved_folders:
             self._apply_saved_selection(saved_files or [], saved_folders or [])
+        
+        # Восстанавливаем свернутые папки и курсор прошлого запуска
+        if view_state and isinstance(view_state, dict):
+            self._apply_view_state(view_state)
+    
+    def get_view_state(self) -> dict:
+        """
+        Состояние дерева для сохранения в настройках проекта: свернутые
+        папки (по умолчанию папки развернуты) и узел под курсором,
+        относительными путями через '/'
+        """
+        collapsed = []
+        stack = [self.tree_root]
+        while stack:
+            node = stack.pop()
+            if not node.is_file:
+                if not node.expanded and node is not self.tree_root:
+                    collapsed.append(self._relative_posix(node))
+                stack.extend(node.children)
+        
+        current_node = self._current_node()
+        return {
+            'collapsed_folders': sorted(collapsed),
+            'cursor': self._relative_posix(current_node) if current_node is not None else None,
+        }
+    
+    def _apply_view_state(self, view_state: dict):
+        """
+        Сворачивает сохраненные папки и ставит курсор на сохраненный узел.
+        Пути, которых больше нет в дереве, пропускаются
+        """
+        collapsed = set(view_state.get('collapsed_folders') or ())
+        cursor = view_state.get('cursor')
+        
+        if collapsed:
+            stack = [self.tree_root]
+            while stack:
+                node = stack.pop()
+                if not node.is_file:
+                    if self._relative_posix(node) in collapsed:
+                        node.expanded = False
+                    stack.extend(node.children)
+        
+        if isinstance(cursor, str) and cursor:
+            # Удаленный с прошлого запуска или скрытый в свернутой папке узел
+            # заменяется ближайшей видимой папкой на его пути (иначе - начало)
+            positions = {self._relative_posix(node): pos
+                         for pos, (node, _) in enumerate(self._get_visible_nodes())}
+            while cursor:
+                pos = positions.get(cursor)
+                if pos is not None:
+                    self.current_pos = pos
+                    self.current_page = pos // self.page_size
+                    break
+                cursor = cursor.rpartition('/')[0]
+    
+    def _relative_posix(self, node: TreeNode) -> str:
+        """Путь узла относительно корня через '/' (как в настройках проекта)"""
+        rel_path = str(node.path)[len(self._root_prefix):]
+        if os.sep != '/':
+            rel_path = rel_path.replace(os.sep, '/')
+        return rel_path
     
     def run(self) -> List[Path]:
         """Запускает интерактивный выбор с сохранением контекста"""
@@ -40,79 +160,117 @@ class InteractiveSelector:
             print("Нет файлов для выбора!")
             return []
         
-        while True:
-            self._display_tree()
-            key = KeyboardHandler.get_key()
-            
-            if not self._handle_key(key):
-                break
+        # Терминал настраивается один раз на весь выбор, а не на каждое нажатие.
+        # Дерево рисуется на отдельном экране: после выбора прежний вывод
+        # терминала возвращается, а кадры не остаются в его истории
+        with KeyboardHandler.raw_mode(on_suspend=self._leave_screen, on_resume=self._resume):
+            self._enter_screen()
+            try:
+                while True:
+                    self._display_tree()
+                    if not self._handle_pending_keys():
+                        break
+            finally:
+                self._leave_screen()
         
+        if self._cancelled:
+            print("Отмена операции.")
         return self.tree_root.get_selected_files()
     
+    def _enter_screen(self):
+        """Переключает терминал на отдельный экран выбора"""
+        if self._alt_screen:
+            sys.stdout.write(ANSI_ALT_SCREEN_ON)
+            sys.stdout.flush()
+    
+    def _leave_screen(self):
+        """Возвращает обычный экран терминала с прежним выводом"""
+        if self._alt_screen:
+            sys.stdout.write(ANSI_ALT_SCREEN_OFF)
+            sys.stdout.flush()
+    
+    def _resume(self):
+        """Возвращается к выбору после fg: снова отдельный экран и полный кадр"""
+        self._enter_screen()
+        self._redraw()
+    
     def _display_tree(self):
         """Отображает дерево файлов С СОХРАНЕНИЕМ КОНТЕКСТА"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        # Плоский список всех видимых узлов не строится: нужны только
+        # их количество и узлы текущей страницы
+        visible_count = self._count_visible_nodes()
+        
+        # При поиске пустой результат показываем в дереве - набор продолжается
+        if not visible_count and self._search_matches is None:
+            self._clear_screen()
+            lines = self._render_context() + ["Нет элементов для отображения!"]
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+            input("Нажмите Enter...")
+            return
         
+        self._draw_frame(self._render_context() + self._render_tree(visible_count))
+    
+    def _redraw(self):
+        """Перерисовывает экран целиком (после возврата из фона экран мог измениться)"""
+        self._last_frame = None
+        self._display_tree()
+    
+    def _render_context(self) -> List[str]:
+        """Строки контекста проекта над деревом"""
         # ВОССТАНАВЛИВАЕМ КОНТЕКСТ ПРОЕКТА
-        print("🚀 CodeCollector")
-        print("=" * 30)
-        print(f"✅ Рабочая директория: {self.root_path}")
+        lines = [
+            "🚀 CodeCollector",
+            "=" * 30,
+            f"✅ Рабочая директория: {self.root_path}",
+        ]
         
         # Показываем информацию о проекте
         if self.project_info:
             project_name = self.project_info.get('name', 'Unknown')
             project_settings = self.project_info.get('settings', '')
-            print(f"🔄 Проект '{project_name}' | {project_settings}")
-        
-        print()  # Разделитель
+            lines.append(f"🔄 Проект '{project_name}' | {project_settings}")
         
-        visible_nodes = self._get_visible_nodes()
+        lines.append("")  # Разделитель
+        return lines
+    
+    def _render_tree(self, visible_count: int) -> List[str]:
+        """Строки шапки, текущей страницы дерева и статистики"""
+        lines = []
         
-        if not visible_nodes:
-            print("Нет элементов для отображения!")
-            input("Нажмите Enter...")
-            return
-
         # Подсчитываем статистику
-        all_files = self.tree_root.get_selected_files()
-        total_files = self.tree_root.get_file_count()
-        selected_files = len(all_files)
+        selected_files, total_files = self._get_stats()
         
-        total_pages = (len(visible_nodes) - 1) // self.page_size + 1 if visible_nodes else 1
+        total_pages = (visible_count - 1) // self.page_size + 1 if visible_count else 1
         start_idx = self.current_page * self.page_size
-        end_idx = min(start_idx + self.page_size, len(visible_nodes))
         
         # Компактная шапка дерева
-        print("╔" + "═" * 80 + "╗")
-        print("║" + f"  ВЫБОР ФАЙЛОВ ({selected_files}/{total_files} файлов выбрано)".ljust(78) + "║")
-        print("║" + f"  Страница {self.current_page + 1}/{total_pages}".ljust(78) + "║")
-        print("╠" + "═" * 80 + "╣")
-        print("║" + "  ↑↓ - навигация, SPACE - выбор, →← - развернуть/свернуть".ljust(78) + "║")
-        print("║" + "  A/N - всё/ничего, +/- - развернуть/свернуть все, R - сброс, Q - выход".ljust(78) + "║")
-        print("╚" + "═" * 80 + "╝")
-        print()
+        lines.append(BOX_TOP)
+        lines.append(BOX_ROW.format(f"  ВЫБОР ФАЙЛОВ ({selected_files}/{total_files} файлов выбрано)"))
+        lines.append(BOX_ROW.format(f"  Страница {self.current_page + 1}/{total_pages}"))
+        lines.append(BOX_SEPARATOR)
+        lines.extend(BOX_HELP)
+        lines.append(BOX_BOTTOM)
+        lines.append("")
 
-        if self.search_term:
-            print(f"🔍 Поиск: '{self.search_term}' (ESC - очистить)")
-            print()
+        if self._search_mode:
+            lines.append(f"🔍 Поиск: '{self.search_term}█' (Enter - готово, ESC - очистить)")
+            lines.append("")
+        elif self.search_term:
+            lines.append(f"🔍 Поиск: '{self.search_term}' (F - изменить, ESC - очистить)")
+            lines.append("")
+        
+        if not visible_count:
+            lines.append("  Ничего не найдено")
         
         # Показываем узлы текущей страницы
-        for i in range(start_idx, end_idx):
-            if i >= len(visible_nodes):
-                break
-                
-            node, depth = visible_nodes[i]
+        for i, (node, depth) in enumerate(self._get_page(self.current_page), start_idx):
             cursor = "→" if i == self.current_pos else " "
-            indent = "  " * depth
+            prefix, label = self._get_row_label(node, depth)
             
             if node.is_file:
                 checkbox = "☑" if node.selected else "☐"
-                name = node.get_display_name()
-                max_name_len = 50 - len(indent)
-                if len(name) > max_name_len:
-                    name = name[:max_name_len-3] + "..."
-                
-                print(f"{cursor} {indent}📄 {checkbox} {name}")
+                lines.append(f"{cursor} {prefix} {checkbox} {label}")
             else:
                 state = node.get_selection_state()
                 if state == 'all':
@@ -123,26 +281,134 @@ class InteractiveSelector:
                     checkbox = "☐"
                 
                 expand_icon = "▼" if node.expanded else "▶"
-                file_count = node.get_file_count()
-                
-                name = node.get_display_name()
+                lines.append(f"{cursor} {prefix} {checkbox} {expand_icon} {label}")
+        
+        # Статистика внизу
+        lines.append("")
+        lines.append(f"Выбрано: {selected_files} файлов")
+        current_node = self._current_node()
+        if current_node is not None:
+            # Путь узла начинается с пути корня (дерево строится из строк) -
+            # относительный путь получаем срезом, без relative_to
+            rel_path = str(current_node.path)[len(self._root_prefix):]
+            lines.append(f"Текущий: {rel_path}")
+        
+        return lines
+    
+    def _get_row_label(self, node: TreeNode, depth: int) -> Tuple[str, str]:
+        """
+        Неизменяемые части строки узла: (отступ с иконкой, обрезанное имя).
+        Имя, глубина и число файлов узла не меняются, поэтому строки
+        форматируются один раз; при перерисовке подставляются только
+        курсор, отметка выбора и значок раскрытия
+        """
+        row_label = self._row_labels.get(node)
+        if row_label is None:
+            indent = "  " * depth
+            name = node.get_display_name()
+            
+            if node.is_file:
+                max_name_len = 50 - len(indent)
+                if len(name) > max_name_len:
+                    name = name[:max_name_len-3] + "..."
+                row_label = (f"{indent}📄", name)
+            else:
                 max_name_len = 35 - len(indent)
                 if len(name) > max_name_len:
                     name = name[:max_name_len-3] + "..."
-                
-                print(f"{cursor} {indent}📁 {checkbox} {expand_icon} {name}/ ({file_count} файлов)")
-        
-        # Статистика внизу
-        print(f"\nВыбрано: {selected_files} файлов")
-        if self.current_pos < len(visible_nodes):
-            current_node, _ = visible_nodes[self.current_pos]
-            rel_path = current_node.path.relative_to(self.root_path)
-            print(f"Текущий: {rel_path}")
+                row_label = (f"{indent}📁", f"{name}/ ({node.get_file_count()} файлов)")
+            
+            self._row_labels[node] = row_label
+        return row_label
+    
+    def _clear_screen(self):
+        """Очищает экран; следующий кадр будет нарисован целиком"""
+        self._last_frame = None
+        if self._ansi:
+            sys.stdout.write(ANSI_CLEAR_SCREEN)
+            sys.stdout.flush()
+        else:
+            os.system('cls' if os.name == 'nt' else 'clear')
+    
+    def _draw_frame(self, lines: List[str]):
+        """
+        Выводит кадр. Если предыдущий кадр той же высоты еще на экране,
+        переписываются только изменившиеся строки (при движении курсора
+        это строки старого и нового положения и строка "Текущий")
+        """
+        previous = self._last_frame
+        
+        if previous is not None and len(previous) == len(lines) and self._frame_fits(lines):
+            out = []
+            for row, (old_line, line) in enumerate(zip(previous, lines), 1):
+                if old_line != line:
+                    out.append(f"\x1b[{row};1H{line}{ANSI_CLEAR_LINE}")
+            # Курсор - под кадром, как после полной отрисовки
+            out.append(f"\x1b[{len(lines) + 1};1H")
+            sys.stdout.write("".join(out))
+            sys.stdout.flush()
+        else:
+            self._clear_screen()
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+        
+        # Точечные обновления возможны только через ANSI
+        self._last_frame = lines if self._ansi else None
+    
+    @staticmethod
+    def _frame_fits(lines: List[str]) -> bool:
+        """
+        Проверяет, что кадр помещается в терминал без переноса строк
+        и прокрутки - иначе номера строк на экране не совпадут с кадром
+        """
+        columns, rows = shutil.get_terminal_size()
+        if len(lines) >= rows:
+            return False
+        # Эмодзи и часть символов занимают две колонки - берем запас
+        return max(len(line) for line in lines) + 4 < columns
+    
+    def _get_stats(self) -> Tuple[int, int]:
+        """Возвращает (выбрано файлов, всего файлов), пересчитывая только после изменений"""
+        if self._stats_cache is None:
+            self._stats_cache = (len(self.tree_root.get_selected_nodes()),
+                                 self.tree_root.get_file_count())
+        return self._stats_cache
+    
+    def _invalidate_visible(self):
+        """Сбрасывает список видимых узлов (после изменения раскрытия многих папок или поиска)"""
+        self._visible_nodes = None
+    
+    def _handle_pending_keys(self) -> bool:
+        """
+        Обрабатывает нажатие и те, что уже ждут во вводе (автоповтор при
+        удержании клавиши): экран перерисовывается один раз на серию, а не
+        на каждое нажатие. Возвращает False при выходе
+        """
+        for _ in range(MAX_COALESCED_KEYS):
+            key = KeyboardHandler.get_key(text_input=self._search_mode)
+            if not self._handle_key(key):
+                return False
+            if not KeyboardHandler.key_pending():
+                break
+        return True
     
     def _handle_key(self, key: str) -> bool:
+        """Обрабатывает нажатие клавиши, сбрасывая кэши после изменений дерева"""
+        result = self._apply_key(key)
+        
+        # Любая клавиша, кроме навигации, может изменить выбор. Список видимых
+        # узлов правят или сбрасывают сами обработчики раскрытия и поиска
+        if key not in NAVIGATION_KEYS:
+            self._stats_cache = None
+        return result
+    
+    def _apply_key(self, key: str) -> bool:
         """Обрабатывает нажатие клавиши с добавлением клавиши R для сброса"""
-        visible_nodes = self._get_visible_nodes()
-        total_pages = (len(visible_nodes) - 1) // self.page_size + 1 if visible_nodes else 1
+        if self._search_mode and self._apply_search_key(key):
+            return True
+        
+        visible_count = self._count_visible_nodes()
+        total_pages = (visible_count - 1) // self.page_size + 1 if visible_count else 1
         
         if key == 'UP':
             if self.current_pos > 0:
@@ -151,14 +417,16 @@ class InteractiveSelector:
                     self.current_page = max(0, self.current_page - 1)
         
         elif key == 'DOWN':
-            if self.current_pos < len(visible_nodes) - 1:
+            if self.current_pos < visible_count - 1:
                 self.current_pos += 1
                 if self.current_pos >= (self.current_page + 1) * self.page_size:
                     self.current_page = min(total_pages - 1, self.current_page + 1)
         
         elif key == 'SPACE':
-            if self.current_pos < len(visible_nodes):
-                current_node, _ = visible_nodes[self.current_pos]
+            current_node = self._current_node()
+            if current_node is not None:
+                # Ручное изменение выбора - возвращать прежний выбор больше нечего
+                self._selection_undo = None
                 if current_node.is_file:
                     current_node.selected = not current_node.selected
                 else:
@@ -168,139 +436,310 @@ class InteractiveSelector:
                     current_node.set_selected_recursive(new_state)
         
         elif key == 'RIGHT':
-            if self.current_pos < len(visible_nodes):
-                current_node, _ = visible_nodes[self.current_pos]
+            current_node = self._current_node()
+            if current_node is not None:
                 if not current_node.is_file:
-                    current_node.expanded = True
+                    self._set_expanded(current_node, True)
         
         elif key == 'LEFT':
-            if self.current_pos < len(visible_nodes):
-                current_node, _ = visible_nodes[self.current_pos]
+            current_node = self._current_node()
+            if current_node is not None:
                 if not current_node.is_file:
-                    current_node.expanded = False
+                    self._set_expanded(current_node, False)
         
         elif key == 'EXPAND':
             self._expand_all(self.tree_root)
+            self._invalidate_visible()
         
         elif key == 'COLLAPSE':
             self._collapse_all(self.tree_root)
+            self._invalidate_visible()
         
         elif key == 'ENTER':
             return False  # Завершить выбор
         
         elif key == 'QUIT':
-            print("\nОтмена операции.")
+            self._cancelled = True
             self.tree_root.set_selected_recursive(False)
             return False
         
         elif key == 'ESC':
             if self.search_term:
-                self.search_term = ""
+                self._set_search_term("")
             else:
-                print("\nОтмена операции.")
+                self._cancelled = True
                 self.tree_root.set_selected_recursive(False)
                 return False
         
         elif key == 'ALL':
+            self._remember_selection()
             self.tree_root.set_selected_recursive(True)
         
         elif key == 'NONE':
+            self._remember_selection()
             self.tree_root.set_selected_recursive(False)
         
-        elif key in ['r', 'R']:  # НОВАЯ КЛАВИША - СБРОС ВЫБОРА
+        elif key in ['r', 'R']:  # СБРОС ВЫБОРА
+            self._remember_selection()
             self.tree_root.set_selected_recursive(False)
         
+        elif key in ['u', 'U']:  # ОТКАТ последнего A/N/R
+            if self._selection_undo is not None:
+                self._restore_selection()
+        
         elif key == 'FIND':
-            print("\nВведите поисковый запрос: ", end="", flush=True)
-            self.search_term = input().strip()
+            # Запрос набирается прямо в дереве, без блокирующего input()
+            self._search_mode = True
         
         return True
     
+    def _apply_search_key(self, key: str) -> bool:
+        """
+        Обрабатывает клавишу в режиме набора поиска. Возвращает False
+        для клавиш, которые обрабатываются как обычно (навигация)
+        """
+        if key == 'ENTER':
+            self._search_mode = False
+        elif key == 'ESC':
+            self._search_mode = False
+            self._set_search_term("")
+        elif key == 'BACKSPACE':
+            self._set_search_term(self.search_term[:-1])
+        elif len(key) == 1 and key.isprintable():
+            self._set_search_term(self.search_term + key)
+        elif key in NAVIGATION_KEYS:
+            return False
+        # Прочие клавиши при наборе игнорируются
+        return True
+    
+    def _set_search_term(self, search_term: str):
+        """
+        Применяет строку поиска: видимыми остаются файлы, в имени которых
+        она встречается, и их папки (раскрытые независимо от состояния)
+        """
+        self.search_term = search_term
+        self.current_pos = 0
+        self.current_page = 0
+        self._invalidate_visible()
+        
+        if not search_term:
+            self._search_matches = None
+            return
+        
+        needle = search_term.lower()
+        matches = set()
+        # Проверка подстроки по готовому списку имен в нижнем регистре,
+        # без обхода дерева на каждое нажатие
+        for node, name in zip(self._flat_files, self._flat_names_lower):
+            if needle in name:
+                # Папки файла добавляются до первой уже отмеченной
+                while node is not None and node not in matches:
+                    matches.add(node)
+                    node = node.parent
+        self._search_matches = matches
+    
+    def _build_search_index(self):
+        """Строит плоский индекс файлов для поиска по имени и снимков выбора"""
+        self._flat_files = list(self._iter_file_nodes())
+        self._file_positions = {node: i for i, node in enumerate(self._flat_files)}
+        self._flat_names_lower = [node.get_display_name().lower() for node in self._flat_files]
+    
     # Остальные методы остаются без изменений
     def _build_file_tree(self) -> TreeNode:
         """Строит дерево файлов из списка путей"""
         tree_root = TreeNode(self.root_path, is_file=False)
         tree_root.expanded = True
         
+        # Индекс папок по строке пути на время построения: папка файла
+        # находится одним запросом к словарю, а Path создается только
+        # для новых папок, а не для каждой части пути каждого файла
+        dir_nodes: Dict[str, TreeNode] = {str(self.root_path): tree_root}
+        
         for file_path in self.files:
-            rel_path = file_path.relative_to(self.root_path)
-            parts = rel_path.parts
-            
-            current_path = self.root_path
-            current_node = tree_root
-            
-            for i, part in enumerate(parts[:-1]):
-                current_path = current_path / part
-                
-                existing_dir = None
-                for child in current_node.children:
-                    if not child.is_file and child.path.name == part:
-                        existing_dir = child
-                        break
-                
-                if existing_dir is None:
-                    dir_node = TreeNode(current_path, is_file=False, parent=current_node)
-                    current_node.children.append(dir_node)
-                    current_node = dir_node
-                else:
-                    current_node = existing_dir
+            parent_str = os.path.dirname(str(file_path))
+            parent_node = dir_nodes.get(parent_str)
+            if parent_node is None:
+                parent_node = self._add_dir_nodes(parent_str, dir_nodes)
             
-            file_node = TreeNode(file_path, is_file=True, parent=current_node)
-            current_node.children.append(file_node)
+            file_node = TreeNode(file_path, is_file=True, parent=parent_node)
+            parent_node.children.append(file_node)
         
         self._sort_tree_children(tree_root)
+        # Число файлов в папках не меняется - считаем его один раз, а не на каждой перерисовке
+        tree_root.cache_file_counts()
         return tree_root
     
+    @staticmethod
+    def _add_dir_nodes(dir_str: str, dir_nodes: Dict[str, TreeNode]) -> TreeNode:
+        """Создает узел папки и недостающие узлы ее родителей, возвращает узел папки"""
+        # Поднимаемся до ближайшей уже созданной папки
+        missing = []
+        while dir_str not in dir_nodes:
+            parent_str = os.path.dirname(dir_str)
+            if parent_str == dir_str:
+                raise ValueError(f"{dir_str!r} is not in the subpath of the project root")
+            missing.append(dir_str)
+            dir_str = parent_str
+        
+        node = dir_nodes[dir_str]
+        for dir_str in reversed(missing):
+            dir_node = TreeNode(Path(dir_str), is_file=False, parent=node)
+            node.children.append(dir_node)
+            dir_nodes[dir_str] = dir_node
+            node = dir_node
+        return node
+    
     def _sort_tree_children(self, node: TreeNode):
-        """Сортирует детей узла рекурсивно"""
-        if not node.is_file:
-            node.children.sort(key=lambda x: (x.is_file, x.path.name.lower()))
-            for child in node.children:
-                self._sort_tree_children(child)
+        """Сортирует детей всех папок ветки (обход явным стеком)"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if not current.is_file:
+                # Имя узла уже посчитано при создании - path.name не разбираем
+                current.children.sort(key=lambda x: (x.is_file, x.get_display_name().lower()))
+                stack.extend(current.children)
     
     def _apply_saved_selection(self, saved_files: List[Path], saved_folders: List[Path]):
         """Применяет сохраненный выбор к дереву файлов"""
-        saved_files_set = set(saved_files)
-        saved_folders_set = set(saved_folders)
-        
-        def mark_selected(node):
+        # Сравниваем строки путей: хэш str кэшируется, а Path на каждом
+        # сравнении заново нормализует части пути
+        saved_files_set = {str(path) for path in saved_files}
+        saved_folders_set = {str(path) for path in saved_folders}
+        
+        stack = [self.tree_root]
+        while stack:
+            node = stack.pop()
             if node.is_file:
-                if node.path in saved_files_set:
+                if str(node.path) in saved_files_set:
                     node.selected = True
+            elif str(node.path) in saved_folders_set:
+                node.set_selected_recursive(True)
             else:
-                if node.path in saved_folders_set:
-                    node.set_selected_recursive(True)
-                else:
-                    for child in node.children:
-                        mark_selected(child)
+                stack.extend(node.children)
+    
+    def _iter_file_nodes(self) -> Iterator[TreeNode]:
+        """Перебирает все файловые узлы дерева"""
+        stack = [self.tree_root]
+        while stack:
+            node = stack.pop()
+            if node.is_file:
+                yield node
+            else:
+                stack.extend(node.children)
+    
+    def _remember_selection(self):
+        """Запоминает текущий выбор перед массовым изменением (A/N/R)"""
+        snapshot = bytearray(len(self._flat_files))
+        positions = self._file_positions
+        for node in self.tree_root.get_selected_nodes():
+            snapshot[positions[node]] = 1
+        self._selection_undo = snapshot
+    
+    def _restore_selection(self):
+        """Возвращает выбор, запомненный перед последним массовым изменением"""
+        snapshot = self._selection_undo
+        self._selection_undo = None
+        
+        # Снимок "все" или "ничего" (подсчет флагов идет в C) восстанавливается
+        # одним отложенным выбором корня, без обхода файлов
+        selected_count = snapshot.count(1)
+        if selected_count in (0, len(snapshot)):
+            self.tree_root.set_selected_recursive(bool(selected_count))
+            return
         
-        mark_selected(self.tree_root)
+        for node, flag in zip(self._flat_files, snapshot):
+            node.selected = flag == 1
     
-    def _get_visible_nodes(self) -> List[Tuple[TreeNode, int]]:
-        """Возвращает список видимых узлов для отображения"""
-        visible = []
+    def _iter_visible_nodes(self) -> Iterator[Tuple[TreeNode, int]]:
+        """Лениво перебирает видимые узлы (узел, глубина) в порядке отображения"""
+        matches = self._search_matches
+        if matches is not None:
+            # При поиске видны только найденные узлы, их папки раскрыты
+            stack = [(child, 1) for child in reversed(self.tree_root.children) if child in matches]
+            while stack:
+                node, depth = stack.pop()
+                yield node, depth
+                
+                if not node.is_file:
+                    stack.extend((child, depth + 1) for child in reversed(node.children)
+                                 if child in matches)
+            return
         
-        def traverse(node, depth=0):
-            if node != self.tree_root:
-                visible.append((node, depth))
+        if self.tree_root.expanded:
+            yield from self._iter_branch(self.tree_root, 0)
+    
+    @staticmethod
+    def _iter_branch(node: TreeNode, depth: int) -> Iterator[Tuple[TreeNode, int]]:
+        """Перебирает видимые узлы внутри раскрытой папки (узел, глубина)"""
+        stack = [(child, depth + 1) for child in reversed(node.children)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
             
             if not node.is_file and node.expanded:
-                for child in node.children:
-                    traverse(child, depth + 1)
+                stack.extend((child, depth + 1) for child in reversed(node.children))
+    
+    def _get_visible_nodes(self) -> List[Tuple[TreeNode, int]]:
+        """Возвращает список видимых узлов (строится после сброса, иначе из кэша)"""
+        if self._visible_nodes is None:
+            self._visible_nodes = list(self._iter_visible_nodes())
+        return self._visible_nodes
+    
+    def _set_expanded(self, node: TreeNode, expanded: bool):
+        """
+        Раскрывает или сворачивает папку под курсором, вставляя или
+        удаляя ее видимую ветку в списке видимых узлов без полного обхода
+        """
+        if node.expanded == expanded:
+            return
+        node.expanded = expanded
+        
+        # При поиске папки раскрыты независимо от флага - список не меняется
+        visible = self._visible_nodes
+        if visible is None or self._search_matches is not None:
+            return
         
-        traverse(self.tree_root)
-        return visible
+        pos = self.current_pos
+        depth = visible[pos][1]
+        if expanded:
+            visible[pos + 1:pos + 1] = list(self._iter_branch(node, depth))
+        else:
+            # Ветка папки - идущие следом узлы глубже нее
+            end = pos + 1
+            while end < len(visible) and visible[end][1] > depth:
+                end += 1
+            del visible[pos + 1:end]
+    
+    def _count_visible_nodes(self) -> int:
+        """Число видимых узлов"""
+        return len(self._get_visible_nodes())
+    
+    def _get_page(self, page: int) -> List[Tuple[TreeNode, int]]:
+        """Возвращает видимые узлы страницы"""
+        start_idx = page * self.page_size
+        return self._get_visible_nodes()[start_idx:start_idx + self.page_size]
+    
+    def _current_node(self) -> Optional[TreeNode]:
+        """Возвращает узел под курсором или None"""
+        visible = self._get_visible_nodes()
+        if 0 <= self.current_pos < len(visible):
+            return visible[self.current_pos][0]
+        return None
     
     def _expand_all(self, node: TreeNode):
-        """Развернуть все папки рекурсивно"""
-        if not node.is_file:
-            node.expanded = True
-            for child in node.children:
-                self._expand_all(child)
+        """Развернуть все папки ветки"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if not current.is_file:
+                current.expanded = True
+                stack.extend(current.children)
     
     def _collapse_all(self, node: TreeNode, depth: int = 0):
         """Свернуть все папки кроме первого уровня"""
-        if not node.is_file:
-            node.expanded = depth == 0
-            for child in node.children:
-                self._collapse_all(child, depth + 1)
\ No newline at end of file
+        stack = [(node, depth)]
+        while stack:
+            current, current_depth = stack.pop()
+            if not current.is_file:
+                current.expanded = current_depth == 0
+                stack.extend((child, current_depth + 1) for child in current.children)
\ No newline at end of file
@@ -7,10 +7,21 @@
 """
 
 import os
+import re
+import json
+import codecs
+import signal
 import sys
 import fnmatch
+from contextlib import contextmanager
 from pathlib import Path
 
+# orjson (extra "fast") - необязательный ускоритель JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Импорты для кроссплатформенного ввода
 try:
     import msvcrt  # Windows
@@ -19,31 +30,142 @@ except ImportError:
     import termios, tty, select  # Unix/Linux/Mac
     WINDOWS = False
 
+# Сколько ждать продолжения ESC-последовательности (мс). Байты стрелок
+# приходят одной записью, так что ожидание заметно только на одиночном ESC
+ESC_SEQUENCE_TIMEOUT_MS = 20
+
+# poll на один дескриптор дешевле select, но на macOS poll не работает с терминалами
+_USE_POLL = not WINDOWS and hasattr(select, 'poll') and sys.platform != 'darwin'
+
+
+def json_loads(data: bytes):
+    """Разбирает JSON через orjson, если он установлен"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj, indent: bool = False) -> bytes:
+    """Сериализует в JSON (UTF-8, без экранирования не-ASCII), при indent=True - с отступом 2"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+
+def enable_ansi_escapes():
+    """
+    Включает обработку ANSI escape-последовательностей в консоли.
+    На Unix терминалы поддерживают их всегда, в консоли Windows 10+
+    нужно включить ENABLE_VIRTUAL_TERMINAL_PROCESSING. Возвращает
+    False, если включить не удалось
+    """
+    if not WINDOWS:
+        return True
+    
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_ulong()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except Exception:
+        return False
+
 
 class KeyboardHandler:
     """
     Обработчик ввода с клавиатуры (кроссплатформенный)
     
     Методы:
-    - get_key() -> str: Получает нажатую клавишу без Enter
-    - _get_key_windows() -> str: Windows-специфичная обработка
-    - _get_key_unix() -> str: Unix/Linux/Mac обработка
+    - raw_mode(on_suspend, on_resume): Контекст посимвольного ввода для серии нажатий
+    - get_key(text_input) -> str: Получает нажатую клавишу без Enter
+    - key_pending() -> bool: Есть ли уже нажатые, но не прочитанные клавиши
+    - _get_key_windows(text_input) -> str: Windows-специфичная обработка
+    - _get_key_unix(text_input) -> str: Unix/Linux/Mac обработка
+    - _read_key_unix(text_input) -> str: Чтение клавиши из настроенного терминала
+    - _read_char_unix() -> str: Чтение одного символа без буфера sys.stdin
+    - _input_ready_unix(timeout_ms) -> bool: Есть ли непрочитанный ввод в stdin
+    
+    При text_input=True (ввод строки поиска) буквы возвращаются как есть,
+    без назначенных им команд, а Backspace - как 'BACKSPACE'
     """
     
+    # Терминал переведен в посимвольный ввод контекстом raw_mode
+    _raw_mode_active = False
+    
+    @staticmethod
+    @contextmanager
+    def raw_mode(on_suspend=None, on_resume=None):
+        """
+        Переводит терминал в посимвольный ввод на время блока, чтобы
+        get_key не перенастраивал его на каждое нажатие. Используется
+        cbreak, а не raw: перевод строки при выводе и Ctrl+C
+        работают как обычно. На Windows ничего не делает
+        
+        При остановке процесса (Ctrl+Z) вызывается on_suspend (например,
+        для возврата обычного экрана), терминал возвращается в обычный
+        режим, а после fg снова переводится в посимвольный; затем
+        вызывается on_resume (например, для полной перерисовки экрана)
+        """
+        if WINDOWS or KeyboardHandler._raw_mode_active or not sys.stdin.isatty():
+            yield
+            return
+        
+        fd = sys.stdin.fileno()
+        old_settings = termios.tcgetattr(fd)
+        
+        def on_stop(signum, frame):
+            if on_suspend is not None:
+                on_suspend()
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+            # Останавливаемся штатным обработчиком; выполнение продолжится после fg
+            signal.signal(signal.SIGTSTP, signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGTSTP)
+            signal.signal(signal.SIGTSTP, on_stop)
+            tty.setcbreak(fd)
+            if on_resume is not None:
+                on_resume()
+        
+        previous_handler = None
+        try:
+            tty.setcbreak(fd)
+            KeyboardHandler._raw_mode_active = True
+            try:
+                previous_handler = signal.signal(signal.SIGTSTP, on_stop)
+            except ValueError:
+                pass  # Не главный поток - обработчик сигнала не установить
+            yield
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGTSTP, previous_handler)
+            KeyboardHandler._raw_mode_active = False
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+    
     @staticmethod
-    def get_key():
+    def get_key(text_input=False):
         """Получает нажатую клавишу без Enter"""
         if WINDOWS:
-            return KeyboardHandler._get_key_windows()
+            return KeyboardHandler._get_key_windows(text_input)
         else:
-            return KeyboardHandler._get_key_unix()
+            return KeyboardHandler._get_key_unix(text_input)
+    
+    @staticmethod
+    def key_pending():
+        """Проверяет без ожидания, есть ли уже нажатые, но не прочитанные клавиши"""
+        if WINDOWS:
+            return msvcrt.kbhit()
+        return KeyboardHandler._input_ready_unix(0)
     
     @staticmethod
-    def _get_key_windows():
+    def _get_key_windows(text_input=False):
         """Windows-специфичная обработка клавиш"""
-        key = msvcrt.getch()
-        if key == b'\xe0' or key == b'\x00':  # Специальные клавиши (стрелки)
-            key2 = msvcrt.getch()
+        # getwch возвращает символ целиком (в том числе кириллицу)
+        key = msvcrt.getwch().encode('utf-8') if text_input else msvcrt.getch()
+        if key == b'\xe0' or key == b'\x00' or key == b'\xc3\xa0':  # Специальные клавиши (стрелки)
+            key2 = msvcrt.getwch().encode('utf-8') if text_input else msvcrt.getch()
             if key2 == b'H' or key2 == b'\x48':  # Стрелка вверх
                 return 'UP'
             elif key2 == b'P' or key2 == b'\x50':  # Стрелка вниз
@@ -52,12 +174,17 @@ class KeyboardHandler:
                 return 'LEFT'
             elif key2 == b'M' or key2 == b'\x4d':  # Стрелка вправо
                 return 'RIGHT'
-        elif key == b' ':  # Пробел
-            return 'SPACE'
+            return ''
         elif key == b'\r':  # Enter
             return 'ENTER'
         elif key == b'\x1b':  # Escape
             return 'ESC'
+        elif text_input:
+            if key == b'\x08':
+                return 'BACKSPACE'
+            return key.decode('utf-8', errors='ignore')
+        elif key == b' ':  # Пробел
+            return 'SPACE'
         elif key == b'q' or key == b'Q':
             return 'QUIT'
         elif key == b'a' or key == b'A':
@@ -81,76 +208,116 @@ class KeyboardHandler:
         return key.decode('utf-8', errors='ignore')
     
     @staticmethod
-    def _get_key_unix():
+    def _get_key_unix(text_input=False):
         """Unix/Linux/Mac обработка клавиш"""
+        # Внутри raw_mode терминал уже настроен - только читаем
+        if KeyboardHandler._raw_mode_active:
+            return KeyboardHandler._read_key_unix(text_input)
+        
         old_settings = termios.tcgetattr(sys.stdin)
         try:
             tty.setraw(sys.stdin.fileno())
-            key = sys.stdin.read(1)
+            return KeyboardHandler._read_key_unix(text_input)
+        finally:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_settings)
+    
+    @staticmethod
+    def _read_char_unix():
+        """
+        Читает один символ прямо из дескриптора stdin. sys.stdin.read(1)
+        забирает в свой буфер всю последовательность клавиши (стрелки -
+        три байта), и select после этого не видит ее продолжения
+        """
+        fd = sys.stdin.fileno()
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        while True:
+            data = os.read(fd, 1)
+            if not data:
+                return ''
+            char = decoder.decode(data)
+            if char:
+                return char
+    
+    @staticmethod
+    def _input_ready_unix(timeout_ms=ESC_SEQUENCE_TIMEOUT_MS):
+        """Проверяет, есть ли непрочитанный ввод в stdin (ждет не дольше timeout_ms)"""
+        fd = sys.stdin.fileno()
+        if _USE_POLL:
+            poller = select.poll()
+            poller.register(fd, select.POLLIN)
+            return bool(poller.poll(timeout_ms))
+        return bool(select.select([fd], [], [], timeout_ms / 1000)[0])
+    
+    @staticmethod
+    def _read_key_unix(text_input=False):
+        """Читает клавишу из терминала, уже переведенного в посимвольный ввод"""
+        key = KeyboardHandler._read_char_unix()
+        
+        if key == '\x1b':  # ESC последовательность
+            # Читаем следующие символы
+            next_chars = ''
+            try:
+                # Проверяем есть ли еще символы (с таймаутом)
+                if KeyboardHandler._input_ready_unix():
+                    next_chars = KeyboardHandler._read_char_unix() + KeyboardHandler._read_char_unix()
+            except:
+                pass
             
-            if key == '\x1b':  # ESC последовательность
-                # Читаем следующие символы
-                next_chars = ''
+            full_seq = key + next_chars
+            
+            if full_seq == '\x1b[A':  # Стрелка вверх
+                return 'UP'
+            elif full_seq == '\x1b[B':  # Стрелка вниз
+                return 'DOWN'
+            elif full_seq == '\x1b[C':  # Стрелка вправо
+                return 'RIGHT'
+            elif full_seq == '\x1b[D':  # Стрелка влево
+                return 'LEFT'
+            elif full_seq == '\x1b[5':  # Page Up
                 try:
-                    # Проверяем есть ли еще символы (с таймаутом)
-                    if select.select([sys.stdin], [], [], 0.1)[0]:
-                        next_chars = sys.stdin.read(2)
+                    if KeyboardHandler._input_ready_unix():
+                        KeyboardHandler._read_char_unix()  # Читаем ~
                 except:
                     pass
-                
-                full_seq = key + next_chars
-                
-                if full_seq == '\x1b[A':  # Стрелка вверх
-                    return 'UP'
-                elif full_seq == '\x1b[B':  # Стрелка вниз
-                    return 'DOWN'
-                elif full_seq == '\x1b[C':  # Стрелка вправо
-                    return 'RIGHT'
-                elif full_seq == '\x1b[D':  # Стрелка влево
-                    return 'LEFT'
-                elif full_seq == '\x1b[5':  # Page Up
-                    try:
-                        if select.select([sys.stdin], [], [], 0.1)[0]:
-                            sys.stdin.read(1)  # Читаем ~
-                    except:
-                        pass
-                    return 'PAGEUP'
-                elif full_seq == '\x1b[6':  # Page Down
-                    try:
-                        if select.select([sys.stdin], [], [], 0.1)[0]:
-                            sys.stdin.read(1)  # Читаем ~
-                    except:
-                        pass
-                    return 'PAGEDOWN'
-                else:
-                    return 'ESC'
-            elif key == ' ':  # Пробел
-                return 'SPACE'
-            elif key == '\r' or key == '\n':  # Enter
-                return 'ENTER'
-            elif key == 'q' or key == 'Q':
-                return 'QUIT'
-            elif key == 'a' or key == 'A':
-                return 'ALL'
-            elif key == 'n' or key == 'N':
-                return 'NONE'
-            elif key == 'w' or key == 'W':  # WASD альтернатива
-                return 'UP'
-            elif key == 's' or key == 'S':
-                return 'DOWN'
-            elif key == 'j':  # Vim-style
-                return 'DOWN'
-            elif key == 'k':
-                return 'UP'
-            elif key == 'f' or key == 'F':
-                return 'FIND'
-            elif key == '+' or key == '=':
-                return 'EXPAND'
-            elif key == '-' or key == '_':
-                return 'COLLAPSE'
+                return 'PAGEUP'
+            elif full_seq == '\x1b[6':  # Page Down
+                try:
+                    if KeyboardHandler._input_ready_unix():
+                        KeyboardHandler._read_char_unix()  # Читаем ~
+                except:
+                    pass
+                return 'PAGEDOWN'
+            else:
+                return 'ESC'
+        elif key == '\r' or key == '\n':  # Enter
+            return 'ENTER'
+        elif text_input:
+            if key == '\x7f' or key == '\x08':
+                return 'BACKSPACE'
             return key
-        finally:
-            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_settings)
+        elif key == ' ':  # Пробел
+            return 'SPACE'
+        elif key == 'q' or key == 'Q':
+            return 'QUIT'
+        elif key == 'a' or key == 'A':
+            return 'ALL'
+        elif key == 'n' or key == 'N':
+            return 'NONE'
+        elif key == 'w' or key == 'W':  # WASD альтернатива
+            return 'UP'
+        elif key == 's' or key == 'S':
+            return 'DOWN'
+        elif key == 'j':  # Vim-style
+            return 'DOWN'
+        elif key == 'k':
+            return 'UP'
+        elif key == 'f' or key == 'F':
+            return 'FIND'
+        elif key == '+' or key == '=':
+            return 'EXPAND'
+        elif key == '-' or key == '_':
+            return 'COLLAPSE'
+        return key
 
 
 class GitignoreHandler:
@@ -159,7 +326,6 @@ class GitignoreHandler:
     
     Методы:
     - parse_gitignore(gitignore_path) -> List[str]: Парсит .gitignore в список паттернов
-    - is_ignored_by_gitignore(file_path, root_path, patterns) -> bool: Проверяет игнорирование файла
     """
     
     @staticmethod
@@ -167,68 +333,259 @@ class GitignoreHandler:
         """Парсит .gitignore файл и возвращает список паттернов"""
         patterns = []
         
-        if not gitignore_path.exists():
-            return patterns
-        
+        # Файл читается одним вызовом, строки разбираются из байтов
+        # (без построчного декодирования текстового режима)
         try:
-            with open(gitignore_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    # Пропускаем пустые строки и комментарии
-                    if not line or line.startswith('#'):
-                        continue
-                    patterns.append(line)
+            data = gitignore_path.read_bytes()
+        except FileNotFoundError:
+            return patterns
         except Exception as e:
             print(f"Предупреждение: Не удалось прочитать .gitignore: {e}")
+            return patterns
+        
+        for line in data.splitlines():
+            line = line.decode('utf-8', errors='replace').strip()
+            # Пропускаем пустые строки и комментарии
+            if not line or line.startswith('#'):
+                continue
+            patterns.append(line)
         
         return patterns
 
-    @staticmethod
-    def is_ignored_by_gitignore(file_path, root_path, gitignore_patterns):
-        """Проверяет, игнорируется ли файл согласно .gitignore"""
-        if not gitignore_patterns:
-            return False
-        
-        # Получаем относительный путь от корня проекта
-        try:
-            rel_path = file_path.relative_to(root_path)
-            rel_path_str = str(rel_path).replace('\\', '/')  # Нормализуем для Windows
-        except ValueError:
-            return False
-        
+
+# Разделитель '/' после os.path.normcase (на Windows - обратный слеш)
+_NORMCASE_SEP = os.path.normcase('/')
+
+
+class GitignoreMatcher:
+    """
+    Паттерны .gitignore, скомпилированные один раз на весь обход
+    
+    Паттерн срабатывает, если совпадает с путем целиком, с любым его
+    "хвостом" (src/a.py, a.py) или с отдельной частью пути. Паттерн
+    с завершающим слешем относится только к папкам: он совпадает
+    с самой папкой (is_dir=True) или с папкой-предком пути, но не
+    с файлом того же имени. Паттерн с ведущим слешем привязан к корню:
+    он совпадает только с началом пути (целыми частями), а '*' в нем
+    не захватывает разделитель. '**/' совпадает с любым числом папок,
+    в том числе с нулем. Паттерн с '!' возвращает в коллекцию то, что
+    игнорируют паттерны выше него: решает последний совпавший паттерн.
+    
+    Все проверки подряд идущих паттернов одного знака собраны в одно
+    регулярное выражение: "хвосты" и части пути начинаются на границах
+    частей (в начале строки или после разделителя - lookbehind), поэтому
+    на путь приходится один вызов search на блок, а без '!' - один вызов
+    вместо цикла по уровням.
+    
+    Методы:
+    - is_ignored(rel_path_str, is_dir) -> bool: Проверяет относительный путь (через '/')
+    """
+    
+    def __init__(self, gitignore_patterns):
+        # Подряд идущие паттерны одного знака: [игнорирует ли, паттерны]
+        groups = []
         for pattern in gitignore_patterns:
-            # Убираем ведущий слеш если есть
-            if pattern.startswith('/'):
+            ignores = not pattern.startswith('!')
+            if not ignores or pattern.startswith('\\!'):
                 pattern = pattern[1:]
+            if not pattern:
+                continue
             
-            # Проверяем точное совпадение
-            if rel_path_str == pattern:
-                return True
-            
-            # Проверяем паттерн как glob
-            if fnmatch.fnmatch(rel_path_str, pattern):
-                return True
-            
-            # Проверяем каждую часть пути для паттернов типа "node_modules"
-            path_parts = rel_path.parts
-            for i in range(len(path_parts)):
-                partial_path = '/'.join(path_parts[i:])
-                if fnmatch.fnmatch(partial_path, pattern):
-                    return True
-                
-                # Проверяем совпадение с отдельными частями
-                if fnmatch.fnmatch(path_parts[i], pattern):
-                    return True
+            if groups and groups[-1][0] == ignores:
+                groups[-1][1].append(pattern)
+            else:
+                groups.append([ignores, [pattern]])
+        
+        # Без '!' паттерн может совпасть и с папкой-предком пути: результат
+        # тот же, что при отсечении папки в обходе. С '!' совпадение
+        # ищется только с самим путем - папки решаются при их обходе
+        whole_path = any(not ignores for ignores, _ in groups)
+        
+        # Блоки проверяются с последнего: решает последний совпавший паттерн
+        self.blocks = [(ignores,) + self._compile_block(patterns, whole_path)
+                       for ignores, patterns in reversed(groups)]
+    
+    @classmethod
+    def _compile_block(cls, patterns, whole_path=False):
+        """
+        Компилирует блок паттернов: (точные пути, search для любого пути,
+        search только для папок). None вместо search - паттернов такого вида нет
+        """
+        sep = re.escape(_NORMCASE_SEP)
+        literals = set()
+        # Паттерны путей и паттерны папок (с завершающим слешем):
+        # (привязанные к корню, со слешем внутри, без слеша)
+        path_groups = ([], [], [])
+        dir_groups = ([], [], [])
+        
+        for pattern in patterns:
+            dir_only = pattern.endswith('/')
+            # Ведущий слеш привязывает паттерн к корню
+            anchored = pattern.startswith('/')
+            pattern = pattern.strip('/')
+            if not pattern:
+                continue
             
-            # Для директорий - проверяем паттерны с завершающим слешем
-            if pattern.endswith('/'):
-                dir_pattern = pattern[:-1]
-                if any(fnmatch.fnmatch(part, dir_pattern) for part in path_parts):
-                    return True
+            if not dir_only:
+                literals.add(pattern)
+            groups = dir_groups if dir_only else path_groups
+            if anchored:
+                groups[0].append(pattern)
+            elif '/' in pattern:
+                groups[1].append(pattern)
+            else:
+                groups[2].append(pattern)
         
+        anchored, with_sep, names = path_groups
+        if whole_path:
+            # Паттерн без слеша сравнивается только с последней частью пути
+            alternatives = cls._alternatives(anchored, with_sep, names, '\\Z')
+        else:
+            # "Хвосты" и отдельные части пути проверяются всеми паттернами
+            alternatives = cls._alternatives(anchored, with_sep + names, with_sep + names,
+                                             f'(?={sep}|\\Z)', '\\Z')
+            # Папка-предок пути (за ней есть разделитель)
+            alternatives += cls._alternatives(*dir_groups, f'(?={sep})')
+        
+        return (literals, cls._compile(alternatives),
+                cls._compile(cls._alternatives(*dir_groups, '\\Z')))
+    
+    @classmethod
+    def _alternatives(cls, anchored, tails, parts, end, tail_end=None):
+        """
+        Части регулярного выражения для паттернов: "хвост" пути совпадает
+        как fnmatch.fnmatch, часть пути - как fnmatch.fnmatch с этой
+        частью (подстановки не захватывают разделитель), привязанный
+        паттерн - с начальными частями пути. end (для "хвостов" - tail_end)
+        задает, что может идти после совпадения
+        """
+        sep = re.escape(_NORMCASE_SEP)
+        if tail_end is None:
+            tail_end = end
+        
+        result = []
+        if anchored:
+            patterns = '|'.join(f'(?:{cls._translate_part(os.path.normcase(pattern), True)})'
+                                for pattern in anchored)
+            result.append(f'^(?:{patterns}){end}')
+        
+        at_boundary = []
+        if tails:
+            patterns = '|'.join(f'(?:{cls._translate_tail(os.path.normcase(pattern))})'
+                                for pattern in tails)
+            at_boundary.append(f'(?:{patterns}){tail_end}')
+        if parts:
+            patterns = '|'.join(f'(?:{cls._translate_part(os.path.normcase(pattern))})'
+                                for pattern in parts)
+            at_boundary.append(f'(?:{patterns}){end}')
+        if at_boundary:
+            result.append(f"(?:^|(?<={sep}))(?:{'|'.join(at_boundary)})")
+        return result
+    
+    @staticmethod
+    def _compile(alternatives):
+        """Компилирует части в одно выражение, возвращает его search (None - частей нет)"""
+        if not alternatives:
+            return None
+        return re.compile('|'.join(alternatives)).search
+    
+    @staticmethod
+    def _translate_tail(pattern):
+        """
+        Переводит glob-паттерн для "хвоста" пути как fnmatch.translate
+        (без привязки к концу строки), но '**/' совпадает и с пустой
+        строкой (ноль папок)
+        """
+        sep = re.escape(_NORMCASE_SEP)
+        # Тело выражения fnmatch.translate: '(?s:...)\\Z' без обертки
+        pieces = [fnmatch.translate(piece)[4:-3] for piece in pattern.split('**' + _NORMCASE_SEP)]
+        any_dirs = f'(?:.*{sep})?'
+        return f"(?s:{any_dirs.join(pieces)})"
+    
+    @staticmethod
+    def _translate_part(pattern, allow_sep=False):
+        """
+        Переводит glob-паттерн в регулярное выражение для одной части
+        пути: как fnmatch.translate, но '*', '?' и классы символов не
+        совпадают с разделителем, а разделитель в паттерне не совпадает
+        ни с чем (в части пути его нет). При allow_sep=True (паттерн,
+        привязанный к корню) разделитель совпадает сам с собой, '**/' -
+        с любым числом папок, а '**' в конце - с остатком пути
+        """
+        sep = re.escape(_NORMCASE_SEP)
+        not_sep = f'[^{sep}]'
+        result = []
+        i, n = 0, len(pattern)
+        while i < n:
+            c = pattern[i]
+            i += 1
+            if c == '*':
+                if allow_sep and i < n and pattern[i] == '*':
+                    while i < n and pattern[i] == '*':
+                        i += 1
+                    if i < n and pattern[i] == _NORMCASE_SEP:
+                        i += 1
+                        result.append(f'(?:.*{sep})?')
+                    else:
+                        result.append('.*')
+                # Несколько звездочек подряд равны одной
+                elif not result or result[-1] != not_sep + '*':
+                    result.append(not_sep + '*')
+            elif c == '?':
+                result.append(not_sep)
+            elif c == _NORMCASE_SEP:
+                result.append(sep if allow_sep else '(?!)')
+            elif c == '[':
+                # Граница класса ищется так же, как в fnmatch.translate
+                j = i
+                if j < n and pattern[j] == '!':
+                    j += 1
+                if j < n and pattern[j] == ']':
+                    j += 1
+                while j < n and pattern[j] != ']':
+                    j += 1
+                if j >= n:
+                    result.append('\\[')
+                else:
+                    # Сам класс переводит fnmatch: '(?s:[...])\\Z' без обертки
+                    char_class = fnmatch.translate(pattern[i - 1:j + 1])[4:-3]
+                    result.append(f'(?!{sep}){char_class}')
+                    i = j + 1
+            else:
+                result.append(re.escape(c))
+        return f"(?s:{''.join(result)})"
+    
+    def is_ignored(self, rel_path_str, is_dir=False):
+        """Проверяет, игнорируется ли относительный путь (is_dir - путь папки)"""
+        if not self.blocks:
+            return False
+        
+        normalized = os.path.normcase(rel_path_str)
+        for ignores, literals, search, dir_search in self.blocks:
+            # Проверяем точное совпадение, затем выражения блока
+            if (rel_path_str in literals
+                    or (search is not None and search(normalized) is not None)
+                    or (is_dir and dir_search is not None and dir_search(normalized) is not None)):
+                return ignores
         return False
 
 
+# Наборы для фильтрации - неизменяемые, создаются один раз при импорте
+SKIP_DIRS = frozenset({
+    'vendor', 'venv', '.venv', '.git', '.svn', '.hg', '.vscode',
+    '__pycache__', 'node_modules', '.codecollector'
+})
+SKIP_FILES = frozenset({'.env', '.gitignore', '.DS_Store'})
+SKIP_EXTENSIONS = frozenset({'.pyc', '.pyo', '.log', '.tmp'})
+TEXT_EXTENSIONS = frozenset({
+    '.py', '.php', '.js', '.html', '.css', '.sql', '.txt', '.md', 
+    '.json', '.xml', '.yml', '.yaml', '.ini', '.conf', '.sh', 
+    '.bat', '.dockerfile', '.gitignore', '.htaccess', '.vue', 
+    '.ts', '.jsx', '.tsx', '.scss', '.less', '.go', '.java', 
+    '.c', '.cpp', '.h', '.rb', '.pl', '.rs'
+})
+
+
 class FileFilters:
     """
     Класс для фильтрации файлов по типам и паттернам
@@ -241,51 +598,75 @@ class FileFilters:
     
     Методы:
     - should_skip_directory(dir_name) -> bool: Проверка пропуска директории
-    - should_skip_file(file_path) -> bool: Проверка пропуска файла
-    - is_text_file(file_path) -> bool: Проверка текстового файла
+    - get_extension(file_name) -> str: Расширение имени файла в нижнем регистре
+    - should_skip_file(file_name, file_ext) -> bool: Проверка пропуска файла по имени
+    - is_text_file(file_path, head) -> bool: Проверка текстового файла
+    - sniff_file(file_path) -> Optional[bytes]: Читает начало файла для проверки
     """
     
-    SKIP_DIRS = {'vendor', 'venv', '.git', '.vscode', '__pycache__', 'node_modules'}
-    SKIP_FILES = {'.env', '.gitignore', '.DS_Store'}
-    SKIP_EXTENSIONS = {'.pyc', '.pyo', '.log', '.tmp'}
-    TEXT_EXTENSIONS = {
-        '.py', '.php', '.js', '.html', '.css', '.sql', '.txt', '.md', 
-        '.json', '.xml', '.yml', '.yaml', '.ini', '.conf', '.sh', 
-        '.bat', '.dockerfile', '.gitignore', '.htaccess', '.vue', 
-        '.ts', '.jsx', '.tsx', '.scss', '.less', '.go', '.java', 
-        '.c', '.cpp', '.h', '.rb', '.pl', '.rs'
-    }
+    SKIP_DIRS = SKIP_DIRS
+    SKIP_FILES = SKIP_FILES
+    SKIP_EXTENSIONS = SKIP_EXTENSIONS
+    TEXT_EXTENSIONS = TEXT_EXTENSIONS
+    SNIFF_SIZE = 8192  # Сколько байт читать для проверки бинарности
     
     @classmethod
     def should_skip_directory(cls, dir_name):
         """Проверяет, нужно ли пропустить директорию"""
-        return dir_name in cls.SKIP_DIRS
+        return dir_name in SKIP_DIRS
+
+    @staticmethod
+    def get_extension(file_name):
+        """Возвращает расширение имени файла в нижнем регистре (как Path.suffix)"""
+        i = file_name.rfind('.')
+        if 0 < i < len(file_name) - 1:
+            return file_name[i:].lower()
+        return ''
 
     @classmethod
-    def should_skip_file(cls, file_path):
-        """Проверяет, нужно ли пропустить файл"""
-        file_name = file_path.name
-        file_ext = file_path.suffix.lower()
-        
-        return (file_name in cls.SKIP_FILES or 
-                file_ext in cls.SKIP_EXTENSIONS or
+    def should_skip_file(cls, file_name, file_ext=None):
+        """
+        Проверяет по имени файла, нужно ли его пропустить
+        file_ext - уже вычисленное расширение (get_extension), чтобы не считать его повторно
+        """
+        if file_ext is None:
+            file_ext = cls.get_extension(file_name)
+        return (file_name in SKIP_FILES or 
+                file_ext in SKIP_EXTENSIONS or
                 file_name.startswith('.env'))
 
     @classmethod
-    def is_text_file(cls, file_path):
-        """Проверяет, является ли файл текстовым"""
+    def is_text_file(cls, file_path, head=None):
+        """
+        Проверяет, является ли файл текстовым (file_path - str или Path)
+        head - уже прочитанное начало файла (см. sniff_file), чтобы не открывать его повторно
+        """
+        file_ext = cls.get_extension(os.path.basename(file_path))
+        
         # Проверяем расширение
-        if file_path.suffix.lower() in cls.TEXT_EXTENSIONS:
+        if file_ext in TEXT_EXTENSIONS:
             return True
         
         # Проверяем файлы без расширения (возможно конфиги)
-        if not file_path.suffix:
-            try:
-                with open(file_path, 'rb') as f:
-                    chunk = f.read(1024)
-                    # Проверяем, есть ли нулевые байты (признак бинарного файла)
-                    return b'\x00' not in chunk
-            except:
-                return False
+        if not file_ext:
+            if head is None:
+                head = cls.sniff_file(file_path)
+            # Проверяем, есть ли нулевые байты (признак бинарного файла)
+            return head is not None and b'\x00' not in head
+        
+        return False
+
+    @classmethod
+    def sniff_file(cls, file_path):
+        """Читает начало файла одним системным вызовом, None при ошибке"""
+        try:
+            fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        except OSError:
+            return None
         
-        return False
\ No newline at end of file
+        try:
+            return os.read(fd, cls.SNIFF_SIZE)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
@@ -8,11 +8,20 @@ MarkdownWriter - вывод в Markdown формате с подсветкой 
 TextWriter - простой текстовый вывод
 """
 
+import os
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 from abc import ABC, abstractmethod
 
+# С какого количества файлов читать содержимое в пуле потоков
+PARALLEL_READ_THRESHOLD = 16
+
+# Размер буфера выходного файла: документ собирается из множества мелких
+# write(), и в файл они уходят крупными блоками
+OUTPUT_BUFFER_SIZE = 1 << 20
+
 
 class OutputWriter(ABC):
     """
@@ -21,34 +30,85 @@ class OutputWriter(ABC):
     
     Атрибуты:
     - root_path: Path - корневой путь проекта
+    - file_contents: Dict[Path, bytes] - уже прочитанное содержимое файлов (от сборщика)
     
     Методы:
-    - write(files, output_file): Абстрактный метод записи файлов
-    - _read_file_content(file_path) -> str: Читает содержимое файла с обработкой кодировок
+    - write(files, output_file) -> int: Абстрактный метод записи файлов
+    - _relative_str(file_path) -> str: Путь файла относительно корня проекта
+    - _read_file_content(file_path) -> bytes: Читает содержимое файла как UTF-8 с обработкой кодировок
+    - _read_files_content(files) -> List[bytes]: Читает содержимое всех файлов с сохранением порядка
+    - _normalize_content(data) -> bytes: Приводит байты файла к UTF-8 с переводами строк '\\n'
+    
+    Выходной файл пишется в двоичном режиме: содержимое файлов в UTF-8
+    без '\\r' копируется как есть, без декодирования и обратного кодирования
     """
     
-    def __init__(self, root_path: Path):
+    def __init__(self, root_path: Path, file_contents: Optional[Dict[Path, bytes]] = None):
         self.root_path = root_path
+        self.file_contents = file_contents or {}
+        # Префикс корня для получения относительных путей срезом строки
+        root_str = str(root_path)
+        self._root_prefix = root_str if root_str.endswith(os.sep) else root_str + os.sep
     
     @abstractmethod
-    def write(self, files: List[Path], output_file: str):
-        """Записывает файлы в выходной файл"""
+    def write(self, files: List[Path], output_file: str) -> int:
+        """Записывает файлы в выходной файл и возвращает его размер в байтах"""
         pass
     
-    def _read_file_content(self, file_path: Path) -> str:
-        """Читает содержимое файла с обработкой кодировок"""
+    def _relative_str(self, file_path: Path) -> str:
+        """Возвращает путь файла относительно корня проекта (срезом строки, без relative_to)"""
+        path_str = str(file_path)
+        if path_str.startswith(self._root_prefix):
+            return path_str[len(self._root_prefix):]
+        return str(file_path.relative_to(self.root_path))
+    
+    def _read_file_content(self, file_path: Path) -> bytes:
+        """Читает содержимое файла с обработкой кодировок (результат - UTF-8)"""
+        # Содержимое от сборщика декодируется так же строго, как прочитанное
+        # здесь: результат не должен зависеть от того, было ли оно в кэше
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            data = self.file_contents.get(file_path)
+            if data is None:
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+            return self._normalize_content(data)
         except UnicodeDecodeError:
-            # Пытаемся прочитать в другой кодировке
-            try:
-                with open(file_path, 'r', encoding='cp1251') as f:
-                    return f.read()
-            except Exception:
-                return "[Ошибка чтения файла: неподдерживаемая кодировка]\n"
+            return "[Ошибка чтения файла: неподдерживаемая кодировка]\n".encode('utf-8')
         except Exception as e:
-            return f"[Ошибка чтения файла: {e}]\n"
+            return f"[Ошибка чтения файла: {e}]\n".encode('utf-8')
+    
+    def _read_files_content(self, files: List[Path]) -> List[bytes]:
+        """
+        Читает содержимое файлов в том же порядке.
+        Чтение - блокирующий I/O, поэтому на больших наборах
+        оно перекрывается в пуле потоков (executor.map сохраняет порядок)
+        """
+        if len(files) < PARALLEL_READ_THRESHOLD:
+            return [self._read_file_content(file_path) for file_path in files]
+        
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self._read_file_content, files))
+    
+    def _normalize_content(self, data: bytes) -> bytes:
+        """
+        Приводит байты файла к тому, что дало бы чтение в текстовом режиме
+        (UTF-8, при ошибке - cp1251; переводы строк '\\n') и кодирует в UTF-8.
+        Байты, которых нет в cp1251, дают UnicodeDecodeError. ASCII и
+        корректный UTF-8 без '\\r' возвращаются без копирования
+        """
+        if not data.isascii():
+            try:
+                data.decode('utf-8')
+            except UnicodeDecodeError:
+                text = data.decode('cp1251')
+                return text.replace('\r\n', '\n').replace('\r', '\n').encode('utf-8')
+        
+        if b'\r' not in data:
+            return data
+        
+        # '\r' в UTF-8 встречается только как сам символ - заменяем в байтах
+        return data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
 
 
 class MarkdownWriter(OutputWriter):
@@ -60,7 +120,7 @@ class MarkdownWriter(OutputWriter):
     - show_structure: bool - включать ли структуру проекта
     
     Методы:
-    - write(files, output_file): Записывает в Markdown формате
+    - write(files, output_file) -> int: Записывает в Markdown формате
     - _write_header(out_f, files): Записывает заголовок документа
     - _write_structure(out_f, files): Записывает структуру проекта как дерево
     - _write_files(out_f, files): Записывает содержимое файлов с подсветкой
@@ -69,54 +129,59 @@ class MarkdownWriter(OutputWriter):
     - _build_tree_text(node_dict, prefix, is_last) -> List[str]: Строит текстовое дерево
     """
     
-    def __init__(self, root_path: Path, show_structure: bool = False):
-        super().__init__(root_path)
+    def __init__(self, root_path: Path, show_structure: bool = False,
+                 file_contents: Optional[Dict[Path, bytes]] = None):
+        super().__init__(root_path, file_contents)
         self.show_structure = show_structure
     
-    def write(self, files: List[Path], output_file: str):
-        """Записывает файлы в Markdown формате"""
-        with open(output_file, 'w', encoding='utf-8') as out_f:
+    def write(self, files: List[Path], output_file: str) -> int:
+        """Записывает файлы в Markdown формате, возвращает размер в байтах"""
+        with open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as out_f:
             self._write_header(out_f, files)
             
             if self.show_structure:
                 self._write_structure(out_f, files)
             
-            out_f.write("---\n\n")
-            out_f.write("## 📄 Содержимое файлов\n\n")
+            out_f.write("---\n\n## 📄 Содержимое файлов\n\n".encode('utf-8'))
             
             self._write_files(out_f, files)
+            
+            # Позиция в конце файла - его размер в байтах
+            return out_f.tell()
     
     def _write_header(self, out_f, files: List[Path]):
         """Записывает заголовок Markdown"""
         project_name = self.root_path.name
-        out_f.write(f"# CodeCollector - {project_name}\n\n")
-        out_f.write(f"**Собрано файлов:** {len(files)}  \n")
-        out_f.write(f"**Дата сбора:** {datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}  \n")
-        out_f.write(f"**Путь:** `{self.root_path}`\n\n")
+        out_f.write((
+            f"# CodeCollector - {project_name}\n\n"
+            f"**Собрано файлов:** {len(files)}  \n"
+            f"**Дата сбора:** {datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}  \n"
+            f"**Путь:** `{self.root_path}`\n\n"
+        ).encode('utf-8'))
     
     def _write_structure(self, out_f, files: List[Path]):
         """Записывает структуру проекта"""
-        out_f.write("## 📁 Структура проекта\n\n")
         structure = self._generate_project_structure(files)
-        out_f.write("```\n")
-        out_f.write(structure)
-        out_f.write("```\n\n")
+        out_f.write(f"## 📁 Структура проекта\n\n```\n{structure}```\n\n".encode('utf-8'))
     
     def _write_files(self, out_f, files: List[Path]):
         """Записывает содержимое файлов"""
-        for file_path in sorted(files):
+        files = sorted(files)
+        # Сначала читаем все файлы, дальше цикл только форматирует вывод
+        contents = self._read_files_content(files)
+        
+        for file_path, content in zip(files, contents):
             try:
-                rel_path = file_path.relative_to(self.root_path)
-                out_f.write(f"### `{rel_path}`\n\n")
+                rel_path = self._relative_str(file_path)
                 
                 # Определяем язык для подсветки синтаксиса
                 lang = self._get_language_for_extension(file_path.suffix.lower())
-                out_f.write(f"```{lang}\n")
+                out_f.write(f"### `{rel_path}`\n\n```{lang}\n".encode('utf-8'))
                 
-                content = self._read_file_content(file_path)
+                # Содержимое уже в UTF-8 - пишется без перекодирования
                 out_f.write(content)
                 
-                out_f.write("\n```\n\n")
+                out_f.write(b"\n```\n\n")
                 print(f"Обработан: {rel_path}")
                 
             except Exception as e:
@@ -188,8 +253,7 @@ class MarkdownWriter(OutputWriter):
         structure = {}
         
         for file_path in files:
-            rel_path = file_path.relative_to(self.root_path)
-            parts = rel_path.parts
+            parts = self._relative_str(file_path).split(os.sep)
             
             current = structure
             # Проходим по всем частям пути
@@ -240,33 +304,37 @@ class TextWriter(OutputWriter):
     Простой формат без разметки для максимальной совместимости
     
     Методы:
-    - write(files, output_file): Записывает в простом текстовом формате
+    - write(files, output_file) -> int: Записывает в простом текстовом формате
     """
     
-    def write(self, files: List[Path], output_file: str):
-        """Записывает файлы в текстовом формате"""
-        with open(output_file, 'w', encoding='utf-8') as out_f:
+    def write(self, files: List[Path], output_file: str) -> int:
+        """Записывает файлы в текстовом формате, возвращает размер в байтах"""
+        with open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as out_f:
             # Простой заголовок
             project_name = self.root_path.name
-            out_f.write(f"CodeCollector - {project_name}\n")
-            out_f.write(f"Собрано файлов: {len(files)}\n")
-            out_f.write(f"Дата сбора: {datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n")
-            out_f.write(f"Путь: {self.root_path}\n")
-            out_f.write("=" * 80 + "\n\n")
+            out_f.write((
+                f"CodeCollector - {project_name}\n"
+                f"Собрано файлов: {len(files)}\n"
+                f"Дата сбора: {datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n"
+                f"Путь: {self.root_path}\n"
+                + "=" * 80 + "\n\n"
+            ).encode('utf-8'))
             
             # Записываем файлы
-            for file_path in sorted(files):
+            files = sorted(files)
+            contents = self._read_files_content(files)
+            
+            for file_path, content in zip(files, contents):
                 try:
-                    rel_path = file_path.relative_to(self.root_path)
-                    out_f.write(f"# {rel_path}\n")
-                    out_f.write("-" * 40 + "\n")
+                    rel_path = self._relative_str(file_path)
+                    out_f.write(f"# {rel_path}\n{'-' * 40}\n".encode('utf-8'))
                     
-                    content = self._read_file_content(file_path)
                     out_f.write(content)
-                    out_f.write("\n\n")
+                    out_f.write(b"\n\n")
                     
                     print(f"Обработан: {rel_path}")
                     
                 except Exception as e:
                     print(f"Ошибка при обработке {file_path}: {e}")
-                    continue
\ No newline at end of file
+                    continue            
+            return out_f.tell()
@@ -81,6 +81,9 @@ setup(
     
     # Дополнительные зависимости для разработки
     extras_require={
+        'fast': [
+            'orjson>=3.0',
+        ],
         'dev': [
             'pytest>=6.0',
             'pytest-cov>=2.0',
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тесты кэша проверки содержимого CodeCollector
+"""
+
+from codecollector.collector import CodeCollector
+from codecollector.config import Config
+from codecollector.models import ProjectSettings
+
+
+def test_scan_cache_does_not_collide_with_project_settings(tmp_path):
+    # Проект с именем, совпадавшим со старым файлом кэша
+    root = tmp_path / 'scan_cache'
+    root.mkdir()
+    (root / 'Makefile').write_text("all:\n", encoding='utf-8')
+    (root / 'main.py').write_text("print(1)\n", encoding='utf-8')
+
+    settings = ProjectSettings(root)
+    settings.save_settings({'sort_by_time': False}, [root / 'main.py'], [])
+
+    collector = CodeCollector(root, Config())
+    collected = collector.scan_and_collect()
+
+    assert {path.name for path in collected} == {'Makefile', 'main.py'}
+    assert collector.scan_cache_file.exists()
+    assert collector.scan_cache_file != settings.settings_file
+
+    settings.invalidate_cache()
+    assert settings.load_settings()['selected_files'] == ['main.py']
+
+
+def test_scan_cache_is_reused(tmp_path):
+    (tmp_path / 'Makefile').write_text("all:\n", encoding='utf-8')
+    (tmp_path / 'blob').write_bytes(b"\x00\x01\x02")
+
+    CodeCollector(tmp_path, Config()).scan_and_collect()
+    collector = CodeCollector(tmp_path, Config())
+    cache = collector._load_scan_cache()
+
+    assert set(cache) == {'Makefile', 'blob'}
+    assert [path.name for path in collector.scan_and_collect()] == ['Makefile']
+    # Неизменившиеся файлы не перечитываются
+    assert collector.file_contents == {}
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тесты разбора аргументов командной строки и объединения с настройками проекта
+"""
+
+import pytest
+
+from codecollector.config import DEFAULT_OUTPUT_FILE, Config, ConfigManager
+from codecollector.models import ProjectSettings
+
+
+def parse(monkeypatch, *args):
+    monkeypatch.setattr('sys.argv', ['codecollector', *args])
+    return ConfigManager.parse_cli_args()
+
+
+def test_defaults(monkeypatch):
+    config = parse(monkeypatch)
+
+    assert config == Config()
+    assert config.markdown_format
+    assert config.show_structure
+    assert not config.interactive
+    assert not config.sort_by_time
+    assert not config.remote_mode
+    assert config.source_dir is None
+    assert config.output_file == DEFAULT_OUTPUT_FILE == "collected_files.md"
+
+
+@pytest.mark.parametrize('flag, field, value', [
+    ('-i', 'interactive', True),
+    ('--interactive', 'interactive', True),
+    ('-t', 'sort_by_time', True),
+    ('--time', 'sort_by_time', True),
+    ('--sort-time', 'sort_by_time', True),
+    ('--no-time', 'sort_by_time', False),
+    ('-s', 'show_structure', True),
+    ('--structure', 'show_structure', True),
+    ('--no-structure', 'show_structure', False),
+    ('-r', 'remote_mode', True),
+    ('--remote', 'remote_mode', True),
+])
+def test_flag_sets_field(monkeypatch, flag, field, value):
+    config = parse(monkeypatch, flag)
+
+    assert getattr(config, field) == value
+    # Остальные поля остаются по умолчанию
+    defaults = Config()
+    setattr(defaults, field, value)
+    assert config == defaults
+
+
+def test_last_flag_wins(monkeypatch):
+    assert not parse(monkeypatch, '-t', '--no-time').sort_by_time
+    assert parse(monkeypatch, '--no-time', '-t').sort_by_time
+    assert parse(monkeypatch, '--no-structure', '-s').show_structure
+
+
+def test_markdown_flags_are_not_accepted(monkeypatch):
+    # Результат всегда пишется MarkdownWriter - флаги формата не разбираются
+    config = parse(monkeypatch, '--no-markdown')
+
+    assert config.markdown_format
+    assert config == Config()
+
+
+def test_unknown_flags_are_ignored(monkeypatch):
+    # Флаги режимов разбирает приложение, а не Config
+    assert parse(monkeypatch, '--quick', '--setup', '--debug', '--bogus') == Config()
+
+
+def test_positional_source_dir(monkeypatch):
+    config = parse(monkeypatch, 'src')
+
+    assert config.source_dir == 'src'
+    assert config.output_file == DEFAULT_OUTPUT_FILE
+
+
+def test_second_positional_sets_output_file(monkeypatch):
+    config = parse(monkeypatch, '-t', 'src', '--no-structure', 'out.md', 'extra')
+
+    assert config.source_dir == 'src'
+    assert config.output_file == 'out.md'
+    assert config.sort_by_time
+    assert not config.show_structure
+
+
+def test_cli_flags_override_saved_preferences(monkeypatch, tmp_path):
+    settings = ProjectSettings(tmp_path)
+    settings.save_settings({'sort_by_time': True, 'show_structure': False}, [], [])
+
+    config = ConfigManager.merge_with_saved_settings(parse(monkeypatch), settings)
+    assert config.sort_by_time
+    assert not config.show_structure
+
+    config = ConfigManager.merge_with_saved_settings(parse(monkeypatch, '--no-time', '-s'), settings)
+    assert not config.sort_by_time
+    assert config.show_structure
+
+
+def test_setup_does_not_ask_about_explicit_flags(monkeypatch):
+    def fail_input(prompt):
+        raise AssertionError(f"unexpected prompt: {prompt}")
+    monkeypatch.setattr('builtins.input', fail_input)
+
+    config = ConfigManager.interactive_config_setup(parse(monkeypatch, '-i', '-t', '--no-structure'))
+    assert config.interactive
+    assert config.sort_by_time
+    assert not config.show_structure
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тесты GitignoreMatcher и фильтрации .gitignore в сборщике
+"""
+
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from codecollector.collector import CodeCollector
+from codecollector.config import Config
+from codecollector.utils import GitignoreMatcher
+
+
+def ignored(patterns, path, is_dir=False):
+    return GitignoreMatcher(patterns).is_ignored(path, is_dir)
+
+
+def make_tree(root: Path, files, gitignore):
+    """Создает файлы (с текстовым содержимым) и .gitignore проекта"""
+    for rel_path in files:
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("text\n", encoding='utf-8')
+    (root / '.gitignore').write_text("\n".join(gitignore) + "\n", encoding='utf-8')
+
+
+def collect(root: Path):
+    """Относительные пути файлов, которые соберет CodeCollector"""
+    files = CodeCollector(root, Config()).scan_and_collect()
+    return {path.relative_to(root).as_posix() for path in files}
+
+
+class TestDirOnlyPatterns:
+    def test_file_with_dir_name_is_not_ignored(self):
+        assert not ignored(['build_file/'], 'build_file')
+        assert not ignored(['build_file/'], 'src/build_file')
+
+    def test_directory_is_ignored(self):
+        assert ignored(['build_file/'], 'build_file', is_dir=True)
+        assert ignored(['build_file/'], 'src/build_file', is_dir=True)
+
+    def test_path_inside_directory_is_ignored(self):
+        assert ignored(['build_file/'], 'build_file/a.py')
+        assert ignored(['build_file/'], 'src/build_file/a.py')
+
+    def test_anchored_directory(self):
+        assert ignored(['/build/'], 'build', is_dir=True)
+        assert not ignored(['/build/'], 'build')
+        assert not ignored(['/build/'], 'src/build', is_dir=True)
+
+    def test_directory_with_slash_inside(self):
+        assert ignored(['a/b/'], 'a/b', is_dir=True)
+        assert not ignored(['a/b/'], 'a/b')
+
+    def test_collector_keeps_file_named_like_dir_pattern(self, tmp_path):
+        make_tree(tmp_path, ['build_file', 'build/a.py', 'src/build/b.py', 'src/c.py'], ['build_file/', 'build/'])
+        assert collect(tmp_path) == {'build_file', 'src/c.py'}
+
+
+class TestNegation:
+    def test_last_matching_pattern_wins(self):
+        assert not ignored(['*.log', '!keep.log'], 'keep.log')
+        assert ignored(['!keep.log', '*.log'], 'keep.log')
+        assert ignored(['*.log', '!keep.log'], 'other.log')
+
+    def test_whitelist_idiom(self):
+        patterns = ['*', '!*/', '!*.py']
+        assert ignored(patterns, 'a.txt')
+        assert ignored(patterns, 'build_file')
+        assert ignored(patterns, 'src/build2')
+        assert not ignored(patterns, 'src', is_dir=True)
+        assert not ignored(patterns, 'src/a.py')
+
+    def test_negated_directory_does_not_reinclude_its_files(self):
+        patterns = ['*.txt', '!keep/']
+        assert not ignored(patterns, 'keep', is_dir=True)
+        assert ignored(patterns, 'keep/k.txt')
+
+    def test_negated_name_does_not_match_parent_dirs(self):
+        # Совпадение с папкой решается при ее обходе, а не для файлов внутри
+        assert ignored(['*.txt', '!keep*'], 'keepdir/a.txt')
+
+    def test_escaped_exclamation_is_literal(self):
+        assert ignored(['\\!important'], '!important')
+
+    def test_collector_whitelist_idiom(self, tmp_path):
+        make_tree(tmp_path, ['a.txt', 'build_file', 'docs/a/b.md', 'keep/k.txt', 'src/build2', 'src/main.py', 'run.py'],
+                  ['*', '!*/', '!*.py'])
+        assert collect(tmp_path) == {'src/main.py', 'run.py'}
+
+
+class TestAnchoredPatterns:
+    def test_matches_only_from_root(self):
+        assert ignored(['/build'], 'build', is_dir=True)
+        assert ignored(['/build'], 'build/a.py')
+        assert not ignored(['/build'], 'src/build', is_dir=True)
+        assert not ignored(['/build'], 'src/build/a.py')
+
+    def test_star_does_not_cross_separator(self):
+        assert ignored(['/a/*.py'], 'a/x.py')
+        assert not ignored(['/a/*.py'], 'a/b/x.py')
+
+    def test_collector_anchored(self, tmp_path):
+        make_tree(tmp_path, ['secret.txt', 'docs/secret.txt', 'a/x.py', 'a/b/x.py'], ['/secret.txt', '/a/*.py'])
+        assert collect(tmp_path) == {'docs/secret.txt', 'a/b/x.py'}
+
+
+class TestDoubleStar:
+    def test_leading_double_star_matches_zero_dirs(self):
+        assert ignored(['**/foo'], 'foo')
+        assert ignored(['**/foo'], 'x/y/foo')
+
+    def test_middle_double_star(self):
+        assert ignored(['a/**/b'], 'a/b')
+        assert ignored(['a/**/b'], 'a/x/y/b')
+
+    def test_trailing_double_star(self):
+        assert ignored(['foo/**'], 'foo/bar/baz')
+        assert not ignored(['foo/**'], 'foo', is_dir=True)
+
+    def test_anchored_double_star(self):
+        assert ignored(['/d/**/f'], 'd/f')
+        assert ignored(['/d/**/f'], 'd/e/g/f')
+        assert not ignored(['/d/**/f'], 'x/d/f')
+
+
+# Сравнение с самим git: паттерны без слеша внутри (кроме ведущего и '**/'),
+# для которых правила сборщика совпадают с правилами git
+GIT_PATTERNS = [
+    '*.log', '/a', '/a/', '/a/b', '/a/*.py', 'b/', '**/b', '**/a/b', '/c/**', '!x.py', '!/a/x.py',
+    '!*.log', 'x.py', '/x.py', '!b/', '*.txt', '/**/z.txt', '!/b', '/a/b/', '**/x.py', '!**/z.txt',
+    '/d/**/f', '/d/**', '!/d/e/', '/*.py', '!/a/*.log', '/a/b/*', '*', '!*/', '!*.py', 'f/', '!f',
+]
+GIT_DIRS = ['a', 'b', 'a/b', 'a/c', 'b/a', 'c/a/b', 'd/e/f']
+# Имена файлов совпадают и с именами папок из паттернов
+GIT_FILES = ['x.py', 'y.log', 'z.txt', 'b', 'f']
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason="git не установлен")
+def test_matches_git_on_random_pattern_sets(tmp_path):
+    candidates = GIT_FILES + [f'{folder}/{name}' for folder in GIT_DIRS for name in GIT_FILES]
+    paths = [rel_path for rel_path in candidates if rel_path not in GIT_DIRS]
+    rng = random.Random(11)
+
+    for round_no in range(40):
+        patterns = rng.sample(GIT_PATTERNS, rng.randint(1, 5))
+        root = tmp_path / str(round_no)
+        root.mkdir()
+        subprocess.run(['git', 'init', '-q', str(root)], check=True)
+        for rel_path in paths:
+            (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+            (root / rel_path).write_text('1', encoding='utf-8')
+        (root / '.gitignore').write_text("\n".join(patterns) + "\n", encoding='utf-8')
+
+        listed = subprocess.run(['git', '-C', str(root), 'ls-files', '-o', '-i', '--exclude-standard'],
+                                capture_output=True, text=True, check=True).stdout.split()
+        git_ignored = set(listed)
+
+        matcher = GitignoreMatcher(patterns)
+        for rel_path in paths:
+            parts = rel_path.split('/')
+            # Как при обходе: папки проверяются до входа в них
+            ours = any(matcher.is_ignored('/'.join(parts[:i]), i < len(parts))
+                       for i in range(1, len(parts) + 1))
+            assert ours == (rel_path in git_ignored), (patterns, rel_path)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тесты выбора режима работы приложения и точки входа
+"""
+
+import pytest
+
+from codecollector.collector import CodeCollector
+from codecollector.config import ConfigManager
+from codecollector.main import CodeCollectorApp, main
+from codecollector.models import ProjectSettings
+
+SAVED = {'project_name': 'demo', 'preferences': {}}
+
+
+@pytest.mark.parametrize('args, saved_settings, mode', [
+    (frozenset(), None, "FIRST_TIME_SETUP"),
+    (frozenset(), SAVED, "QUICK_RUN"),
+    (frozenset({'--setup'}), SAVED, "FORCE_SETUP"),
+    (frozenset({'--quick'}), None, "FORCE_QUICK"),
+    (frozenset({'--reset'}), SAVED, "RESET_AND_SETUP"),
+    # --setup важнее --quick, --quick важнее --reset
+    (frozenset({'--quick', '--setup'}), SAVED, "FORCE_SETUP"),
+    (frozenset({'--reset', '--quick'}), SAVED, "FORCE_QUICK"),
+    # Прочие флаги режим не меняют
+    (frozenset({'-t', '--debug', 'src'}), SAVED, "QUICK_RUN"),
+])
+def test_determine_mode(args, saved_settings, mode):
+    assert CodeCollectorApp()._determine_mode(saved_settings, args) == mode
+
+
+def test_determine_mode_ignores_sys_argv(monkeypatch):
+    monkeypatch.setattr('sys.argv', ['codecollector', '--setup'])
+    assert CodeCollectorApp()._determine_mode(None, frozenset({'--quick'})) == "FORCE_QUICK"
+
+
+def test_main_passes_parsed_args_to_app(monkeypatch):
+    monkeypatch.setattr('sys.argv', ['codecollector', '--quick', '--debug', 'src'])
+    apps = []
+    monkeypatch.setattr(CodeCollectorApp, 'run', lambda self: apps.append(self) or 0)
+
+    assert main() == 0
+    assert apps[0].args == frozenset({'--quick', '--debug', 'src'})
+    assert apps[0].debug
+
+
+def test_app_without_args_reads_sys_argv(monkeypatch):
+    monkeypatch.setattr('sys.argv', ['codecollector', '--reset'])
+    assert CodeCollectorApp().args == frozenset({'--reset'})
+
+
+def test_help_does_not_start_app(monkeypatch, capsys):
+    monkeypatch.setattr('sys.argv', ['codecollector', '--help'])
+    monkeypatch.setattr(CodeCollectorApp, 'run', lambda self: pytest.fail("app started"))
+
+    assert main() == 0
+    assert "--quick" in capsys.readouterr().out
+
+
+def test_saved_preferences_have_no_output_format(monkeypatch, tmp_path):
+    monkeypatch.setattr('sys.argv', ['codecollector', '--no-markdown', '-t'])
+    app = CodeCollectorApp()
+    app.config = ConfigManager.parse_cli_args()
+    app.project_settings = ProjectSettings(tmp_path)
+    app.collector = CodeCollector(tmp_path, app.config)
+    app._save_user_preferences([])
+
+    preferences = ProjectSettings(tmp_path).load_settings()['preferences']
+    assert 'markdown_format' not in preferences
+    assert preferences['sort_by_time']
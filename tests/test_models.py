@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тесты модели выбора TreeNode: сравнение с наивной рекурсивной моделью
+"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from codecollector.models import TreeNode
+
+
+def build_random_tree(rng):
+    """Случайное дерево: корень, списки папок и файлов"""
+    root = TreeNode(Path('/project'), is_file=False)
+    folders = [root]
+    files = []
+    for i in range(rng.randint(1, 40)):
+        parent = rng.choice(folders)
+        if rng.random() < 0.35:
+            node = TreeNode(parent.path / f'd{i}', is_file=False, parent=parent)
+            folders.append(node)
+        else:
+            node = TreeNode(parent.path / f'f{i}', is_file=True, parent=parent)
+            files.append(node)
+        parent.children.append(node)
+    return root, folders, files
+
+
+def branch_files(node):
+    """Файлы ветки в порядке обхода дерева (рекурсивно)"""
+    if node.is_file:
+        return [node]
+    result = []
+    for child in node.children:
+        result += branch_files(child)
+    return result
+
+
+def reference_state(node, chosen):
+    """Состояние выбора по определению: по состояниям детей (пустая папка - 'none')"""
+    if node.is_file:
+        return 'all' if chosen[node] else 'none'
+    states = [reference_state(child, chosen) for child in node.children]
+    if not states or all(state == 'none' for state in states):
+        return 'none'
+    if all(state == 'all' for state in states):
+        return 'all'
+    return 'partial'
+
+
+@pytest.mark.parametrize('seed', range(40))
+@pytest.mark.parametrize('cache_counts', [False, True])
+def test_selection_matches_naive_model(seed, cache_counts):
+    rng = random.Random(seed)
+    root, folders, files = build_random_tree(rng)
+    if cache_counts:
+        root.cache_file_counts()
+    # Наивная модель: флаг выбора каждого файла
+    chosen = {node: False for node in files}
+
+    for step in range(80):
+        action = rng.random()
+        node = rng.choice(folders + files)
+        if action < 0.3:
+            value = rng.random() < 0.5
+            node.set_selected_recursive(value)
+            for file_node in branch_files(node):
+                chosen[file_node] = value
+        elif action < 0.5 and files:
+            file_node = rng.choice(files)
+            file_node.selected = not file_node.selected
+            chosen[file_node] = not chosen[file_node]
+        elif action < 0.8:
+            assert node.get_selection_state() == reference_state(node, chosen), (seed, step)
+        else:
+            expected = [file_node for file_node in branch_files(node) if chosen[file_node]]
+            assert node.get_selected_files() == [file_node.path for file_node in expected], (seed, step)
+            assert node.get_selected_nodes() == expected, (seed, step)
+
+    # В конце - все узлы, включая файлы под отложенным выбором папок
+    for node in folders:
+        assert node.get_selection_state() == reference_state(node, chosen), seed
+    assert [node.selected for node in files] == [chosen[node] for node in files], seed
+
+
+def test_empty_folder_counts_as_unselected_child():
+    root = TreeNode(Path('/project'), is_file=False)
+    empty = TreeNode(root.path / 'empty', is_file=False, parent=root)
+    file_node = TreeNode(root.path / 'a.py', is_file=True, parent=root)
+    root.children.extend([empty, file_node])
+
+    assert root.get_selection_state() == 'none'
+    file_node.selected = True
+    assert empty.get_selection_state() == 'none'
+    assert root.get_selection_state() == 'partial'
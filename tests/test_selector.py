@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тесты интерактивного селектора без терминала: клавиши подаются в _apply_key
+"""
+
+from codecollector.models import ProjectSettings
+from codecollector.selector import InteractiveSelector
+
+FILES = ['README.md', 'src/app.py', 'src/util/helpers.py', 'src/util/paths.py', 'tests/test_app.py']
+
+
+def make_selector(root, files=FILES, **kwargs):
+    return InteractiveSelector([root / rel_path for rel_path in files], root, **kwargs)
+
+
+def press(selector, *keys):
+    for key in keys:
+        selector._apply_key(key)
+
+
+def type_search(selector, text):
+    press(selector, 'FIND', *text)
+
+
+def visible(selector):
+    return [selector._relative_posix(node) for node, _ in selector._get_visible_nodes()]
+
+
+def current(selector):
+    return selector._relative_posix(selector._current_node())
+
+
+class TestIncrementalSearch:
+    def test_matches_in_tree_order(self, tmp_path):
+        selector = make_selector(tmp_path)
+        type_search(selector, 'app')
+
+        assert selector.search_term == 'app'
+        assert visible(selector) == ['src', 'src/app.py', 'tests', 'tests/test_app.py']
+        assert current(selector) == 'src'
+
+    def test_match_is_case_insensitive(self, tmp_path):
+        selector = make_selector(tmp_path)
+        type_search(selector, 'READ')
+
+        assert visible(selector) == ['README.md']
+
+    def test_backspace_widens_matches(self, tmp_path):
+        selector = make_selector(tmp_path)
+        type_search(selector, 'pathx')
+        assert visible(selector) == []
+
+        press(selector, 'BACKSPACE')
+        assert selector.search_term == 'path'
+        assert visible(selector) == ['src', 'src/util', 'src/util/paths.py']
+
+        press(selector, 'BACKSPACE', 'BACKSPACE', 'BACKSPACE', 'BACKSPACE')
+        assert selector.search_term == ''
+        assert len(visible(selector)) == 8
+
+    def test_esc_while_typing_clears_term(self, tmp_path):
+        selector = make_selector(tmp_path)
+        type_search(selector, 'app')
+        press(selector, 'ESC')
+
+        assert selector.search_term == ''
+        assert not selector._search_mode
+        assert len(visible(selector)) == 8
+
+    def test_esc_after_enter_clears_term_without_quitting(self, tmp_path):
+        selector = make_selector(tmp_path)
+        type_search(selector, 'app')
+        press(selector, 'ENTER')
+        assert not selector._search_mode
+        assert selector.search_term == 'app'
+
+        assert selector._apply_key('ESC')
+        assert selector.search_term == ''
+        assert not selector._cancelled
+
+    def test_letters_are_typed_not_handled_as_commands(self, tmp_path):
+        selector = make_selector(tmp_path)
+        selector.tree_root.set_selected_recursive(True)
+        type_search(selector, 'r')
+
+        assert selector.search_term == 'r'
+        assert len(selector.tree_root.get_selected_files()) == len(FILES)
+
+    def test_cursor_reaches_matches_inside_collapsed_folders(self, tmp_path):
+        selector = make_selector(tmp_path)
+        press(selector, 'COLLAPSE')
+        assert visible(selector) == ['src', 'tests', 'README.md']
+
+        type_search(selector, 'helpers')
+        assert visible(selector) == ['src', 'src/util', 'src/util/helpers.py']
+
+        # Навигация работает и во время набора
+        press(selector, 'DOWN', 'DOWN')
+        assert current(selector) == 'src/util/helpers.py'
+        press(selector, 'ENTER', 'SPACE')
+        assert selector._current_node().selected
+
+        # После сброса поиска папки снова свернуты, выбор сохранился
+        press(selector, 'ESC')
+        assert visible(selector) == ['src', 'tests', 'README.md']
+        assert [path.name for path in selector.tree_root.get_selected_files()] == ['helpers.py']
+
+    def test_new_term_moves_cursor_to_first_match(self, tmp_path):
+        selector = make_selector(tmp_path)
+        press(selector, 'DOWN', 'DOWN', 'DOWN')
+        type_search(selector, 'test')
+
+        assert selector.current_pos == 0
+        assert current(selector) == 'tests'
+
+
+def selected(selector):
+    return sorted(path.relative_to(selector.root_path).as_posix()
+                  for path in selector.tree_root.get_selected_files())
+
+
+class TestSelectionUndo:
+    def test_undo_restores_partial_selection_after_all_and_none(self, tmp_path):
+        selector = make_selector(tmp_path, saved_files=[tmp_path / 'src/app.py', tmp_path / 'README.md'])
+        before = selected(selector)
+
+        press(selector, 'ALL')
+        assert len(selected(selector)) == len(FILES)
+        press(selector, 'U')
+        assert selected(selector) == before
+
+        press(selector, 'NONE', 'u')
+        assert selected(selector) == before
+
+    def test_r_only_clears(self, tmp_path):
+        selector = make_selector(tmp_path, saved_files=[tmp_path / 'src/app.py'])
+        press(selector, 'R')
+        assert selected(selector) == []
+
+        # Повторное R не возвращает выбор, это делает U
+        press(selector, 'R')
+        assert selected(selector) == []
+        press(selector, 'U')
+        assert selected(selector) == []
+
+    def test_undo_after_r(self, tmp_path):
+        selector = make_selector(tmp_path, saved_files=[tmp_path / 'src/app.py'])
+        press(selector, 'r', 'U')
+        assert selected(selector) == ['src/app.py']
+
+    def test_undo_is_single_step(self, tmp_path):
+        selector = make_selector(tmp_path, saved_files=[tmp_path / 'src/app.py'])
+        press(selector, 'NONE', 'U', 'ALL', 'U', 'U')
+        assert selected(selector) == ['src/app.py']
+
+    def test_space_invalidates_snapshot(self, tmp_path):
+        selector = make_selector(tmp_path, saved_files=[tmp_path / 'src/app.py'])
+        press(selector, 'ALL')
+        assert selector._selection_undo is not None
+
+        # Курсор на README.md - последней строке дерева
+        press(selector, *['DOWN'] * 7)
+        assert current(selector) == 'README.md'
+        press(selector, 'SPACE')
+        assert selector._selection_undo is None
+
+        press(selector, 'U')
+        assert 'README.md' not in selected(selector)
+        assert len(selected(selector)) == len(FILES) - 1
+
+    def test_snapshot_is_one_byte_per_file(self, tmp_path):
+        selector = make_selector(tmp_path, saved_files=[tmp_path / 'tests/test_app.py'])
+        press(selector, 'NONE')
+
+        snapshot = selector._selection_undo
+        assert isinstance(snapshot, bytearray)
+        assert len(snapshot) == len(FILES)
+        assert snapshot.count(1) == 1
+        assert selector._flat_files[snapshot.index(1)].path == tmp_path / 'tests/test_app.py'
+
+
+def saved_view_state(root, view_state):
+    """Сохраняет состояние дерева в настройках проекта и читает его обратно"""
+    settings = ProjectSettings(root)
+    settings.save_settings({}, [], [], view_state)
+    return ProjectSettings(root).load_settings().get('view_state')
+
+
+class TestViewState:
+    def test_round_trip_through_project_settings(self, tmp_path):
+        selector = make_selector(tmp_path)
+        # Сворачиваем src/util и ставим курсор на tests/test_app.py
+        press(selector, 'DOWN', 'LEFT', 'DOWN', 'DOWN', 'DOWN')
+        assert current(selector) == 'tests/test_app.py'
+        view_state = selector.get_view_state()
+        assert view_state == {'collapsed_folders': ['src/util'], 'cursor': 'tests/test_app.py'}
+
+        restored = make_selector(tmp_path, view_state=saved_view_state(tmp_path, view_state))
+        assert visible(restored) == visible(selector)
+        assert current(restored) == 'tests/test_app.py'
+        assert restored.get_view_state() == view_state
+
+    def test_settings_without_view_state(self, tmp_path):
+        # Файл настроек старого формата - ключа view_state нет
+        assert saved_view_state(tmp_path, None) is None
+
+        selector = make_selector(tmp_path, view_state=None)
+        assert len(visible(selector)) == 8
+        assert selector.current_pos == 0
+        assert selector.get_view_state() == {'collapsed_folders': [], 'cursor': 'src'}
+
+    def test_malformed_view_state_is_ignored(self, tmp_path):
+        selector = make_selector(tmp_path, view_state=['src'])
+        assert len(visible(selector)) == 8
+
+        selector = make_selector(tmp_path, view_state={'collapsed_folders': None, 'cursor': 3})
+        assert selector.current_pos == 0
+
+    def test_stale_paths_are_skipped(self, tmp_path):
+        view_state = {'collapsed_folders': ['old', 'src/util', 'src/util/gone'], 'cursor': 'old/file.py'}
+        selector = make_selector(tmp_path, view_state=view_state)
+
+        assert visible(selector) == ['src', 'src/util', 'src/app.py', 'tests', 'tests/test_app.py', 'README.md']
+        assert selector.current_pos == 0
+        assert selector.get_view_state()['collapsed_folders'] == ['src/util']
+
+    def test_cursor_falls_back_to_nearest_visible_folder(self, tmp_path):
+        # Файл под курсором удален, его папка осталась
+        view_state = {'collapsed_folders': [], 'cursor': 'src/util/removed.py'}
+        selector = make_selector(tmp_path, view_state=view_state)
+        assert current(selector) == 'src/util'
+
+        # Файл под курсором внутри свернутой папки
+        view_state = {'collapsed_folders': ['src'], 'cursor': 'src/util/paths.py'}
+        selector = make_selector(tmp_path, view_state=view_state)
+        assert current(selector) == 'src'
+
+    def test_cursor_stays_in_shrunk_tree(self, tmp_path):
+        files = [f'pkg/module_{i:02}.py' for i in range(40)]
+        selector = make_selector(tmp_path, files)
+        press(selector, *['DOWN'] * 40)
+        assert current(selector) == 'pkg/module_39.py'
+        assert selector.current_page == 2
+        view_state = selector.get_view_state()
+
+        selector = make_selector(tmp_path, files[:5], view_state=view_state)
+        assert current(selector) == 'pkg'
+        assert selector.current_page == 0
+        assert selector.current_pos < len(visible(selector))
+
+        press(selector, 'DOWN')
+        assert current(selector) == 'pkg/module_00.py'
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тесты чтения содержимого файлов во writer'ах
+"""
+
+import pytest
+
+from codecollector.writers import MarkdownWriter, TextWriter
+
+UNSUPPORTED = "[Ошибка чтения файла: неподдерживаемая кодировка]\n".encode('utf-8')
+
+# Байт 0x98 не определен в cp1251, остальные - кириллица в cp1251
+SAMPLES = [
+    (b"print('hi')\r\n", b"print('hi')\n"),
+    ("# привет\n".encode('utf-8'), "# привет\n".encode('utf-8')),
+    ("# привет\r\n".encode('cp1251'), "# привет\n".encode('utf-8')),
+    (b"\xef\xf0\x98\n", UNSUPPORTED),
+]
+
+
+@pytest.mark.parametrize('data, expected', SAMPLES)
+@pytest.mark.parametrize('cached', [False, True])
+def test_content_does_not_depend_on_cache(tmp_path, data, expected, cached):
+    path = tmp_path / 'file.py'
+    path.write_bytes(data)
+    writer = TextWriter(tmp_path, {path: data} if cached else None)
+
+    assert writer._read_file_content(path) == expected
+
+
+def test_unsupported_encoding_in_document(tmp_path):
+    good = tmp_path / 'good.py'
+    bad = tmp_path / 'bad.py'
+    good.write_bytes(b"x = 1\n")
+    bad.write_bytes(b"\x98\n")
+    output = tmp_path / 'out.md'
+
+    size = MarkdownWriter(tmp_path, file_contents={bad: b"\x98\n"}).write([good, bad], str(output))
+
+    document = output.read_bytes()
+    assert size == len(document)
+    assert b"x = 1\n" in document
+    assert UNSUPPORTED in document